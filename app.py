@@ -1,10 +1,25 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import tempfile
+import io
+import hashlib
+import json
+import tarfile
+import zipfile
+import sqlite3
+import threading
+import multiprocessing
+import queue
+import signal
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
 from pathlib import Path
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple, Union, BinaryIO, Callable
 import traceback
 
 # Document processing
@@ -12,12 +27,11 @@ import pdfplumber
 from pdf2image import convert_from_path
 import pytesseract
 from PIL import Image
-import docx
 import re
+import xml.etree.ElementTree as ET
 
 # Tokenizers
 import tiktoken
-# from transformers import AutoTokenizer  # Disabled for stability
 # from anthropic import Anthropic  # Disabled for stability
 
 # Configure logging
@@ -27,8 +41,13 @@ logger = logging.getLogger(__name__)
 class TokenCounter:
     """Professional token counter with proper tokenizer implementations"""
     
-    def __init__(self):
+    def __init__(self, tokenizer_dir: Optional[Union[str, Path]] = None):
         self.tokenizers = {}
+        self.tokenizer_dir = Path(tokenizer_dir or os.environ.get(
+            'TOKENFORGE_TOKENIZER_DIR', Path(__file__).parent / 'tokenizers'
+        ))
+        self.hf_tokenizer_files = {}  # name -> tokenizer.json, loaded on first use
+        self._load_lock = threading.Lock()
         self._initialize_tokenizers()
     
     def _initialize_tokenizers(self):
@@ -46,30 +65,28 @@ class TokenCounter:
         except Exception as e:
             logger.warning(f"Failed to initialize tiktoken: {e}")
         
-        # Hugging Face tokenizers (disabled for stability on Python 3.13)
-        # Will be enabled when compatibility is confirmed
-        """
-        hf_models = {
-            'llama2-7b': 'meta-llama/Llama-2-7b-hf',
-            'llama2-13b': 'meta-llama/Llama-2-13b-hf',
-            'mistral-7b': 'mistralai/Mistral-7B-v0.1',
-            'gemma-7b': 'google/gemma-7b',
-            'falcon-7b': 'tiiuae/falcon-7b',
-            'code-llama': 'codellama/CodeLlama-7b-hf',
-        }
+        # Hugging Face fast tokenizers from local <tokenizer_dir>/<name>/tokenizer.json
+        # files (no network access); each is parsed the first time it is used
+        if self.tokenizer_dir.is_dir():
+            for tokenizer_file in sorted(self.tokenizer_dir.glob('*/tokenizer.json')):
+                self.hf_tokenizer_files[tokenizer_file.parent.name] = tokenizer_file
+    
+    def _get_tokenizer(self, model_name: str):
+        """Return a loaded tokenizer, loading local Hugging Face tokenizers lazily"""
+        if model_name in self.tokenizers:
+            return self.tokenizers[model_name]
+        if model_name not in self.hf_tokenizer_files:
+            raise ValueError(f"Tokenizer {model_name} not available")
         
-        for name, model_id in hf_models.items():
-            try:
-                from transformers import AutoTokenizer
-                self.tokenizers[name] = AutoTokenizer.from_pretrained(
-                    model_id, 
-                    trust_remote_code=True,
-                    use_fast=True
-                )
-                logger.info(f"Loaded tokenizer: {name}")
-            except Exception as e:
-                logger.warning(f"Failed to load {name}: {e}")
-        """
+        with self._load_lock:
+            if model_name not in self.tokenizers:
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_file(str(self.hf_tokenizer_files[model_name]))
+                tokenizer.no_truncation()
+                tokenizer.no_padding()
+                self.tokenizers[model_name] = tokenizer
+                logger.info(f"Loaded tokenizer: {model_name}")
+        return self.tokenizers[model_name]
     
     def get_available_tokenizers(self) -> Dict[str, str]:
         """Get list of available tokenizers with descriptions"""
@@ -79,96 +96,1401 @@ class TokenCounter:
             'text-davinci-003': 'OpenAI GPT-3 (text-davinci-003)',
             'cl100k_base': 'OpenAI cl100k_base (GPT-4, GPT-3.5)',
             'p50k_base': 'OpenAI p50k_base (GPT-3, Codex)',
-            # HF models disabled for stability
-            # 'llama2-7b': 'Meta Llama 2 7B',
-            # 'llama2-13b': 'Meta Llama 2 13B',
-            # 'mistral-7b': 'Mistral 7B',
-            # 'gemma-7b': 'Google Gemma 7B',
-            # 'falcon-7b': 'Falcon 7B',
-            # 'code-llama': 'Meta Code Llama 7B',
         }
+        for name in self.hf_tokenizer_files:
+            descriptions.setdefault(name, f'Hugging Face {name} (local tokenizer.json)')
         
-        return {k: v for k, v in descriptions.items() if k in self.tokenizers}
+        return {k: v for k, v in descriptions.items() if k in self.tokenizers or k in self.hf_tokenizer_files}
     
     def count_tokens(self, text: str, model_name: str) -> Dict[str, Any]:
         """Count tokens using the specified model"""
-        if model_name not in self.tokenizers:
-            raise ValueError(f"Tokenizer {model_name} not available")
-        
-        tokenizer = self.tokenizers[model_name]
+        tokenizer = self._get_tokenizer(model_name)
         
         try:
-            if hasattr(tokenizer, 'encode'):
-                if isinstance(tokenizer, tiktoken.Encoding):
-                    # tiktoken tokenizer
-                    tokens = tokenizer.encode(text)
-                    return {
-                        'token_count': len(tokens),
-                        'tokens': tokens[:100],  # First 100 tokens for preview
-                        'tokenizer_type': 'tiktoken'
-                    }
-                else:
-                    # Hugging Face tokenizer
-                    encoding = tokenizer.encode(text)
-                    return {
-                        'token_count': len(encoding),
-                        'tokens': encoding[:100],  # First 100 tokens for preview
-                        'tokenizer_type': 'huggingface'
-                    }
+            if isinstance(tokenizer, tiktoken.Encoding):
+                # tiktoken tokenizer; special-token strings such as <|endoftext|> in
+                # documents are counted as the plain text they are
+                tokens = tokenizer.encode(text, disallowed_special=())
+                return {
+                    'token_count': len(tokens),
+                    'tokens': tokens[:100],  # First 100 tokens for preview
+                    'tokenizer_type': 'tiktoken'
+                }
             else:
-                raise ValueError(f"Invalid tokenizer type for {model_name}")
+                # Hugging Face tokenizer (content tokens only, no BOS/EOS)
+                encoding = tokenizer.encode(text, add_special_tokens=False)
+                return {
+                    'token_count': len(encoding.ids),
+                    'tokens': encoding.ids[:100],  # First 100 tokens for preview
+                    'tokenizer_type': 'huggingface'
+                }
         except Exception as e:
             logger.error(f"Error counting tokens with {model_name}: {e}")
             raise
+    
+    def count_tokens_batch(self, texts: List[str], model_name: str) -> List[int]:
+        """Count tokens for many texts at once using the tokenizer's native parallel batch encoder"""
+        return [len(ids) for ids in self.encode_ids_batch(texts, model_name)]
+    
+    def encode_ids(self, text: str, model_name: str) -> np.ndarray:
+        """Encode text to a compact uint32 array of token IDs"""
+        tokenizer = self._get_tokenizer(model_name)
+        if isinstance(tokenizer, tiktoken.Encoding):
+            return np.fromiter(tokenizer.encode(text, disallowed_special=()), dtype=np.uint32)
+        return np.asarray(tokenizer.encode(text, add_special_tokens=False).ids, dtype=np.uint32)
+    
+    def encode_ids_batch(self, texts: List[str], model_name: str) -> List[np.ndarray]:
+        """Encode many texts in parallel (tiktoken thread pool / Rust-parallel encode_batch)"""
+        tokenizer = self._get_tokenizer(model_name)
+        try:
+            if isinstance(tokenizer, tiktoken.Encoding):
+                batches = tokenizer.encode_batch(texts, num_threads=os.cpu_count() or 1, disallowed_special=())
+            else:
+                # encode_batch_fast (tokenizers >= 0.21) skips offset tracking we never use
+                encode_batch = getattr(tokenizer, 'encode_batch_fast', tokenizer.encode_batch)
+                batches = [e.ids for e in encode_batch(texts, add_special_tokens=False)]
+        except Exception as e:
+            logger.error(f"Error batch encoding with {model_name}: {e}")
+            raise
+        return [np.asarray(ids, dtype=np.uint32) for ids in batches]
+    
+    def vocab_size(self, model_name: str) -> int:
+        """Number of token IDs the tokenizer can emit"""
+        tokenizer = self._get_tokenizer(model_name)
+        if isinstance(tokenizer, tiktoken.Encoding):
+            return tokenizer.n_vocab
+        return tokenizer.get_vocab_size(with_added_tokens=True)
+    
+    def decode_token(self, token_id: int, model_name: str) -> str:
+        """Human-readable text for a single token ID"""
+        tokenizer = self._get_tokenizer(model_name)
+        if isinstance(tokenizer, tiktoken.Encoding):
+            return tokenizer.decode_single_token_bytes(token_id).decode('utf-8', errors='replace')
+        return tokenizer.decode([token_id], skip_special_tokens=False)
+
+# Text-bearing parts of a DOCX package, in reading order
+DOCX_PART_ORDER = ('document', 'header', 'footer', 'footnotes', 'endnotes', 'comments')
+DOCX_TEXT_PART = re.compile(r'^word/(document|header|footer|footnotes|endnotes|comments)\d*\.xml$')
 
 class DocumentProcessor:
     """Handle document text extraction"""
     
+    SUPPORTED_TYPES = ('txt', 'pdf', 'docx')
+    
+    # OCR rendering profiles: 'fast' is tuned for token estimation, 'accurate' for
+    # faithful text. DPI is chosen per page so the long edge lands near
+    # target_long_edge pixels, clamped to [min_dpi, max_dpi]; the density probe
+    # is the rendered page downsampled to probe_dpi.
+    OCR_PROFILES = {
+        'fast': {
+            'target_long_edge': 1800,
+            'min_dpi': 100,
+            'max_dpi': 200,
+            'binarize': 'fixed',
+            'probe_dpi': 24,
+            'tesseract_config': '--oem 1 -c tessedit_do_invert=0',
+        },
+        'accurate': {
+            'target_long_edge': 3300,
+            'min_dpi': 200,
+            'max_dpi': 400,
+            'binarize': 'otsu',
+            'probe_dpi': 36,
+            'tesseract_config': '--oem 1',
+        },
+    }
+    
+    # Ink measured on the low-resolution probe; a page is only skipped as blank
+    # when almost no probe pixel carries ink, so a lone heading still gets OCR
+    BLANK_PAGE_INK_PIXELS = 4
+    SPARSE_TEXT_DENSITY = 0.01
+    DENSE_TEXT_DENSITY = 0.08
+    
+    # Consecutive pages rendered by one pdftoppm run (each run re-parses the PDF)
+    OCR_RENDER_BATCH = 8
+    
     @staticmethod
-    def extract_text(file_bytes: bytes, file_type: str) -> str:
-        """Extract text from various document types"""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as tmp_file:
-            tmp_file.write(file_bytes)
-            file_path = tmp_file.name
+    def extract_pages(file_bytes: bytes, file_type: str, ocr_mode: str = 'accurate',
+                      progress: Optional[Callable[[str], None]] = None) -> List[str]:
+        """Extract text page by page (PDFs keep their pages, other formats are a single page)"""
+        pages = {}
+        for index, text in DocumentProcessor.iter_pages(file_bytes, file_type, ocr_mode, progress):
+            pages[index] = text
+        return [pages[i] for i in range(len(pages))]
+    
+    @staticmethod
+    def iter_pages(file_bytes: bytes, file_type: str, ocr_mode: str = 'accurate',
+                   progress: Optional[Callable[[str], None]] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (page index, text) as each page is extracted.
         
-        try:
-            if file_type == 'txt':
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.read()
+        A PDF without a text layer first yields its empty pages and then yields
+        the same indices again with the OCR text, so consumers keep the last value.
+        OCR status messages go to ``progress`` (this may run in a worker process,
+        so the caller decides how to show them).
+        """
+        if file_type == 'txt':
+            yield 0, file_bytes.decode('utf-8', errors='ignore')
+        
+        elif file_type == 'pdf':
+            # Try text extraction first, straight from memory
+            page_sizes = []
+            found_text = False
+            with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+                for index, page in enumerate(pdf.pages):
+                    text = page.extract_text() or ""
+                    found_text = found_text or bool(text.strip())
+                    page_sizes.append((float(page.width), float(page.height)))
+                    yield index, text
             
-            elif file_type == 'pdf':
-                # Try text extraction first
-                text = ""
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                
-                # If no text found, use OCR
-                if not text.strip():
-                    st.info("No text found in PDF. Using OCR...")
-                    images = convert_from_path(file_path)
-                    ocr_text = []
-                    for i, img in enumerate(images):
-                        with st.spinner(f"Processing page {i+1}/{len(images)}..."):
-                            page_text = pytesseract.image_to_string(img, lang='eng')
-                            ocr_text.append(page_text)
-                    text = "\n".join(ocr_text)
-                
-                return text
+            # If no text found, use OCR (poppler renders from a file on disk)
+            if not found_text:
+                if progress:
+                    progress("No text found in PDF. Using OCR...")
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                    tmp_file.write(file_bytes)
+                    file_path = tmp_file.name
+                try:
+                    yield from enumerate(DocumentProcessor.iter_ocr_pages(file_path, page_sizes, ocr_mode, progress))
+                    if progress:
+                        progress(f"No text found in PDF. Recognized {len(page_sizes)} pages with OCR.")
+                finally:
+                    os.unlink(file_path)
+        
+        elif file_type == 'docx':
+            yield 0, DocumentProcessor.extract_docx(io.BytesIO(file_bytes))
+        
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+    
+    @staticmethod
+    def extract_docx(source: Union[str, Path, BinaryIO]) -> str:
+        """Stream text out of a DOCX package with iterparse.
+        
+        Covers the body (including tables and text boxes), headers, footers,
+        footnotes, endnotes and comments. Paragraphs are detached from the tree
+        as soon as they are read, so memory does not grow with document size.
+        """
+        w = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+        fallback = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+        paragraphs = []
+        
+        with zipfile.ZipFile(source) as package:
+            parts = [name for name in package.namelist() if DOCX_TEXT_PART.match(name)]
+            parts.sort(key=lambda name: (DOCX_PART_ORDER.index(DOCX_TEXT_PART.match(name).group(1)), name))
+            
+            for part in parts:
+                with package.open(part) as stream:
+                    stack = []
+                    runs = []  # one run list per open paragraph (text boxes nest paragraphs)
+                    fallback_depth = 0  # mc:Fallback repeats the mc:Choice content
+                    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                        if event == 'start':
+                            stack.append(elem)
+                            if elem.tag == fallback:
+                                fallback_depth += 1
+                            elif elem.tag == f'{w}p':
+                                runs.append([])
+                            continue
+                        
+                        stack.pop()
+                        if elem.tag == fallback:
+                            fallback_depth -= 1
+                        elif elem.tag == f'{w}p':
+                            text = ''.join(runs.pop())
+                            if not fallback_depth:
+                                paragraphs.append(text)
+                            if stack:
+                                stack[-1].remove(elem)
+                        elif elem.tag == f'{w}tbl':
+                            if stack:
+                                stack[-1].remove(elem)  # Drop the emptied row/cell skeleton too
+                        elif fallback_depth or not runs:
+                            pass
+                        elif elem.tag == f'{w}t':
+                            runs[-1].append(elem.text or '')
+                        elif elem.tag == f'{w}tab':
+                            runs[-1].append('\t')
+                        elif elem.tag in (f'{w}br', f'{w}cr'):
+                            runs[-1].append('\n')
+        
+        return "\n".join(paragraphs)
+    
+    @staticmethod
+    def ocr_pdf(file_path: str, page_sizes: List[tuple], ocr_mode: str = 'accurate') -> List[str]:
+        """OCR a PDF with per-page rendering settings"""
+        return list(DocumentProcessor.iter_ocr_pages(file_path, page_sizes, ocr_mode))
+    
+    @staticmethod
+    def iter_ocr_pages(file_path: str, page_sizes: List[tuple], ocr_mode: str = 'accurate',
+                       progress: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+        """Yield OCR text for each page as it is recognized"""
+        if ocr_mode not in DocumentProcessor.OCR_PROFILES:
+            raise ValueError(f"Unknown OCR mode: {ocr_mode}")
+        profile = DocumentProcessor.OCR_PROFILES[ocr_mode]
+        dpis = [DocumentProcessor.ocr_dpi(width_pt, height_pt, profile) for width_pt, height_pt in page_sizes]
+        
+        start = 0
+        while start < len(page_sizes):
+            # One render per run of consecutive pages that share a DPI
+            end = start + 1
+            while end < len(page_sizes) and end - start < DocumentProcessor.OCR_RENDER_BATCH \
+                    and dpis[end] == dpis[start]:
+                end += 1
+            images = convert_from_path(file_path, dpi=dpis[start], grayscale=True,
+                                       first_page=start + 1, last_page=end)
             
-            elif file_type == 'docx':
-                doc = docx.Document(file_path)
-                paragraphs = [para.text for para in doc.paragraphs]
-                return "\n".join(paragraphs)
+            for i, img in enumerate(images, start=start):
+                if progress:
+                    progress(f"Using OCR: page {i + 1}/{len(page_sizes)}...")
+                # Box-filtered copy of the render stands in for a separate low-DPI probe render
+                scale = profile['probe_dpi'] / dpis[i]
+                probe = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                                   Image.BOX)
+                settings = DocumentProcessor.choose_ocr_settings(probe)
+                if settings is None:
+                    text = ""  # Blank page, nothing to recognize
+                else:
+                    img = DocumentProcessor.binarize(img, profile['binarize'])
+                    text = pytesseract.image_to_string(
+                        img, lang='eng', config=f"{profile['tesseract_config']} --psm {settings['psm']}"
+                    )
+                yield text
+            
+            del images
+            start = end
+    
+    @staticmethod
+    def ocr_dpi(width_pt: float, height_pt: float, profile: Dict[str, Any]) -> int:
+        """Render DPI that puts the page's long edge near the profile's target pixel count"""
+        long_edge_inches = max(width_pt, height_pt) / 72
+        return int(np.clip(profile['target_long_edge'] / long_edge_inches, profile['min_dpi'], profile['max_dpi']))
+    
+    @staticmethod
+    def choose_ocr_settings(probe: Image.Image) -> Optional[Dict[str, int]]:
+        """Pick the tesseract page segmentation mode for one page, or None if it is blank"""
+        # Ink coverage relative to the paper colour; averaging survives the probe's low resolution
+        pixels = np.asarray(probe.convert('L'), dtype=np.float32)
+        paper = max(float(np.percentile(pixels, 95)), 1.0)
+        ink = np.clip((paper - pixels) / paper, 0.0, 1.0)
+        if int((ink > 0.2).sum()) < DocumentProcessor.BLANK_PAGE_INK_PIXELS:
+            return None
+        density = float(ink.mean())
+        
+        if density < DocumentProcessor.SPARSE_TEXT_DENSITY:
+            psm = 11  # Sparse text: find as much text as possible in no particular order
+        elif density > DocumentProcessor.DENSE_TEXT_DENSITY:
+            psm = 6  # Dense page: treat as a single uniform block of text
+        else:
+            psm = 3  # Fully automatic page segmentation
+        return {'psm': psm}
+    
+    @staticmethod
+    def binarize(img: Image.Image, method: str) -> Image.Image:
+        """Threshold a grayscale page to black and white"""
+        pixels = np.asarray(img.convert('L'))
+        if method == 'otsu':
+            histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+            weight_bg = np.cumsum(histogram)
+            weight_fg = weight_bg[-1] - weight_bg
+            cumulative_mean = np.cumsum(histogram * np.arange(256))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean_bg = cumulative_mean / weight_bg
+                mean_fg = (cumulative_mean[-1] - cumulative_mean) / weight_fg
+                between_variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+            threshold = int(np.argmax(np.nan_to_num(between_variance)))
+        else:
+            threshold = 160
+        return Image.fromarray(np.where(pixels > threshold, 255, 0).astype(np.uint8))
+    
+    @staticmethod
+    def extract_text(file_bytes: bytes, file_type: str, ocr_mode: str = 'accurate') -> str:
+        """Extract text from various document types"""
+        pages = DocumentProcessor.extract_pages(file_bytes, file_type, ocr_mode)
+        return "\n".join(page for page in pages if page)
+    
+    @staticmethod
+    def split_chunks(text: str, chunk_chars: int) -> List[str]:
+        """Split text into chunks of at most chunk_chars, breaking before whitespace
+        so each chunk boundary falls where the tokenizers already split words"""
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = min(start + chunk_chars, len(text))
+            if end < len(text):
+                split = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+                if split > start:
+                    end = split
+            chunks.append(text[start:end])
+            start = end
+        return chunks
+
+class BatchResultWriter:
+    """Stream per-document, per-page and per-chunk token counts to Parquet or Arrow IPC.
+    
+    Rows are buffered and flushed as one row group every ``row_group_size`` rows,
+    so batch runs over any number of documents keep memory flat. Page and
+    document totals are summed from the chunk counts, so every text is encoded
+    once per encoding.
+    """
+    
+    SCHEMA = pa.schema([
+        ('source', pa.string()),
+        ('level', pa.string()),  # 'document', 'page' or 'chunk'
+        ('page', pa.int32()),
+        ('chunk', pa.int32()),
+        ('encoding', pa.string()),
+        ('tokens', pa.int64()),
+        ('characters', pa.int64()),
+        ('words', pa.int64()),
+    ])
+    
+    FORMATS = ('parquet', 'arrow')
+    
+    def __init__(self, destination: Union[str, Path, BinaryIO], token_counter: 'TokenCounter',
+                 encodings: Optional[List[str]] = None, file_format: str = 'parquet',
+                 chunk_chars: int = 4000, row_group_size: int = 65536):
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        
+        self.token_counter = token_counter
+        self.encodings = encodings or list(token_counter.get_available_tokenizers())
+        self.chunk_chars = chunk_chars
+        self.row_group_size = row_group_size
+        self.documents_written = 0
+        self._columns = {name: [] for name in self.SCHEMA.names}
+        
+        sink = str(destination) if isinstance(destination, Path) else destination
+        if file_format == 'parquet':
+            self._writer = pq.ParquetWriter(sink, self.SCHEMA, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(sink, self.SCHEMA)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+    
+    def _append(self, source, level, page, chunk, encoding, tokens, characters, words):
+        row = (source, level, page, chunk, encoding, tokens, characters, words)
+        for name, value in zip(self.SCHEMA.names, row):
+            self._columns[name].append(value)
+    
+    def add_document(self, source: str, pages: List[str]) -> Dict[str, int]:
+        """Count one document and buffer its rows; returns document token totals per encoding"""
+        page_chunks = [DocumentProcessor.split_chunks(page, self.chunk_chars) for page in pages]
+        totals = {}
+        
+        all_chunks = [chunk for chunks in page_chunks for chunk in chunks]
+        # Count with every encoding before buffering rows, so a failure leaves no partial document
+        counts = {encoding: self.token_counter.count_tokens_batch(all_chunks, encoding)
+                  for encoding in self.encodings}
+        
+        for encoding in self.encodings:
+            chunk_tokens = iter(counts[encoding])
+            doc_tokens = doc_chars = doc_words = 0
+            for page_number, chunks in enumerate(page_chunks, start=1):
+                page_tokens = page_chars = page_words = 0
+                for chunk_number, chunk in enumerate(chunks, start=1):
+                    tokens = next(chunk_tokens)
+                    words = len(chunk.split())
+                    self._append(source, 'chunk', page_number, chunk_number, encoding,
+                                 tokens, len(chunk), words)
+                    page_tokens += tokens
+                    page_chars += len(chunk)
+                    page_words += words
+                self._append(source, 'page', page_number, None, encoding,
+                             page_tokens, page_chars, page_words)
+                doc_tokens += page_tokens
+                doc_chars += page_chars
+                doc_words += page_words
+            self._append(source, 'document', None, None, encoding,
+                         doc_tokens, doc_chars, doc_words)
+            totals[encoding] = doc_tokens
+        
+        self.documents_written += 1
+        if len(self._columns['source']) >= self.row_group_size:
+            self._flush()
+        return totals
+    
+    def _flush(self):
+        if not self._columns['source']:
+            return
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self.SCHEMA)
+        if isinstance(self._writer, pq.ParquetWriter):
+            self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_batch(batch)
+        self._columns = {name: [] for name in self.SCHEMA.names}
+    
+    def close(self):
+        """Flush buffered rows and finalize the file footer"""
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+def iter_document_files(root: Union[str, Path]) -> Iterable[Path]:
+    """Yield supported documents under root (or root itself if it is a file)"""
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.rsplit('.', 1)[-1].lower() in DocumentProcessor.SUPPORTED_TYPES:
+                yield Path(dirpath) / filename
+
+def extract_file_pages(path: Union[str, Path], worker_pool: Optional['ExtractionWorkerPool'] = None) -> List[str]:
+    """Extract one document from disk, in the worker pool when one is given"""
+    path = Path(path)
+    file_type = path.suffix.lstrip('.').lower()
+    if worker_pool is None:
+        return DocumentProcessor.extract_pages(path.read_bytes(), file_type)
+    extraction = worker_pool.extract(path.read_bytes(), file_type)
+    if extraction['status'] != 'ok':
+        raise RuntimeError(f"{extraction['status']}: {extraction['error']}")
+    return extraction['pages']
+
+def iter_extracted_documents(roots: Iterable[Union[str, Path]],
+                             worker_pool: Optional['ExtractionWorkerPool'] = None) -> Iterator[Tuple[Path, List[str]]]:
+    """Yield (path, pages) for every document under roots, skipping (and logging) ones that fail"""
+    for root in roots:
+        for path in iter_document_files(root):
+            try:
+                pages = extract_file_pages(path, worker_pool)
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            yield path, pages
+
+def export_batch_results(roots: Iterable[Union[str, Path]], destination: Union[str, Path],
+                         token_counter: 'TokenCounter', encodings: Optional[List[str]] = None,
+                         file_format: str = 'parquet', chunk_chars: int = 4000,
+                         worker_pool: Optional['ExtractionWorkerPool'] = None) -> int:
+    """Extract and count every document under roots, writing rows incrementally; returns documents written"""
+    with BatchResultWriter(destination, token_counter, encodings, file_format, chunk_chars) as writer:
+        for path, pages in iter_extracted_documents(roots, worker_pool):
+            try:
+                writer.add_document(str(path), pages)
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {e}")
+        return writer.documents_written
+
+class VocabularyAnalyzer:
+    """Streaming token-ID frequency analytics across a corpus.
+    
+    Token IDs are buffered as uint32 arrays and folded into one int64 histogram
+    per encoding with np.bincount once ``buffer_tokens`` IDs have accumulated, so
+    memory is bounded by the vocabulary size rather than the corpus size.
+    """
+    
+    def __init__(self, token_counter: 'TokenCounter', encodings: Optional[List[str]] = None,
+                 buffer_tokens: int = 1 << 20):
+        self.token_counter = token_counter
+        self.encodings = encodings or list(token_counter.get_available_tokenizers())
+        self.buffer_tokens = buffer_tokens
+        self.counts = {enc: np.zeros(token_counter.vocab_size(enc), dtype=np.int64) for enc in self.encodings}
+        self._buffers = {enc: [] for enc in self.encodings}
+        self._buffered = {enc: 0 for enc in self.encodings}
+        self.documents = 0
+        self.characters = 0
+        self.utf8_bytes = 0
+    
+    def add_text(self, text: str):
+        """Add one document to the running histograms"""
+        # Encode with every encoding first, so a failure leaves the statistics untouched
+        encoded = {encoding: self.token_counter.encode_ids(text, encoding) for encoding in self.encodings}
+        self.documents += 1
+        self.characters += len(text)
+        self.utf8_bytes += len(text.encode('utf-8', errors='ignore'))
+        
+        for encoding, ids in encoded.items():
+            self._buffers[encoding].append(ids)
+            self._buffered[encoding] += len(ids)
+            if self._buffered[encoding] >= self.buffer_tokens:
+                self._flush(encoding)
+    
+    def _flush(self, encoding: str):
+        if not self._buffers[encoding]:
+            return
+        ids = np.concatenate(self._buffers[encoding])
+        counts = self.counts[encoding]
+        binned = np.bincount(ids, minlength=len(counts))
+        if len(binned) > len(counts):
+            # IDs beyond the reported vocabulary (e.g. added special tokens)
+            binned[:len(counts)] += counts
+            self.counts[encoding] = binned
+        else:
+            counts += binned
+        self._buffers[encoding] = []
+        self._buffered[encoding] = 0
+    
+    def summary(self, rare_threshold: int = 5) -> pd.DataFrame:
+        """Per-encoding compression and vocabulary usage statistics"""
+        rows = []
+        for encoding in self.encodings:
+            self._flush(encoding)
+            counts = self.counts[encoding]
+            total = int(counts.sum())
+            used = counts > 0
+            rare = used & (counts <= rare_threshold)
+            rows.append({
+                'encoding': encoding,
+                'tokens': total,
+                'distinct_tokens': int(used.sum()),
+                'vocab_coverage': used.mean(),
+                'chars_per_token': self.characters / total if total else 0.0,
+                'bytes_per_token': self.utf8_bytes / total if total else 0.0,
+                'rare_token_rate': counts[rare].sum() / total if total else 0.0,
+            })
+        return pd.DataFrame(rows).set_index('encoding')
+    
+    def top_tokens(self, encoding: str, top_n: int = 20) -> pd.DataFrame:
+        """Most frequent tokens for one encoding"""
+        self._flush(encoding)
+        counts = self.counts[encoding]
+        top_n = min(top_n, int((counts > 0).sum()))
+        if top_n == 0:
+            return pd.DataFrame(columns=['token_id', 'token', 'count', 'share'])
+        
+        top_ids = np.argpartition(counts, -top_n)[-top_n:]
+        top_ids = top_ids[np.argsort(counts[top_ids])[::-1]]
+        return pd.DataFrame({
+            'token_id': top_ids,
+            'token': [self.token_counter.decode_token(int(i), encoding) for i in top_ids],
+            'count': counts[top_ids],
+            'share': counts[top_ids] / counts.sum(),
+        })
+
+def analyze_vocabulary(roots: Iterable[Union[str, Path]], token_counter: 'TokenCounter',
+                       encodings: Optional[List[str]] = None,
+                       worker_pool: Optional['ExtractionWorkerPool'] = None) -> VocabularyAnalyzer:
+    """Stream every document under roots through a VocabularyAnalyzer"""
+    analyzer = VocabularyAnalyzer(token_counter, encodings)
+    for path, pages in iter_extracted_documents(roots, worker_pool):
+        try:
+            analyzer.add_text("\n".join(page for page in pages if page))
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+    return analyzer
+
+class DuplicateDetector:
+    """Exact and near-duplicate detection over token shingles.
+    
+    Exact duplicates are found by a content hash of the whitespace-normalized
+    text. Near duplicates use MinHash signatures over ``shingle_size``-token
+    shingles, indexed with LSH banding so each new document is only compared
+    against documents sharing at least one band. Signatures are kept in a
+    single uint32 matrix (num_perm * 4 bytes per unique document).
+    """
+    
+    MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+    SHINGLE_BLOCK = 8192
+    
+    def __init__(self, token_counter: 'TokenCounter', model_name: str, shingle_size: int = 5,
+                 num_perm: int = 128, bands: int = 16, threshold: float = 0.8, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        
+        self.token_counter = token_counter
+        self.model_name = model_name
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        
+        # Permutations (a * h + b) mod p with 32-bit a, b and h, so a * h + b never overflows uint64
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)[:, None]
+        self._shingle_weights = np.uint64(0x9E3779B97F4A7C15) ** np.arange(shingle_size, dtype=np.uint64)
+        
+        self._content_hashes = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self._unique_count = 0
+        self._unique_documents = []  # signature row -> document index
+        
+        self.sources = []
+        self.token_counts = []
+        self.statuses = []
+        self.duplicate_of = []
+        self.similarities = []
+    
+    def _signature(self, ids: np.ndarray) -> np.ndarray:
+        """MinHash signature of the token shingles in ids"""
+        ids = ids.astype(np.uint64)
+        if len(ids) < self.shingle_size:
+            ids = np.pad(ids, (0, self.shingle_size - len(ids)))
+        windows = np.lib.stride_tricks.sliding_window_view(ids, self.shingle_size)
+        hashes = windows @ self._shingle_weights  # wraps modulo 2**64
+        hashes = np.unique((hashes >> np.uint64(32)) ^ (hashes & np.uint64(0xFFFFFFFF)))
+        
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, len(hashes), self.SHINGLE_BLOCK):
+            block = hashes[start:start + self.SHINGLE_BLOCK][None, :]
+            permuted = (self._a * block + self._b) % self.MERSENNE_PRIME
+            signature = np.minimum(signature, (permuted & np.uint64(0xFFFFFFFF)).min(axis=1).astype(np.uint32))
+        return signature
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+    
+    def add_document(self, source: str, text: str) -> Dict[str, Any]:
+        """Classify a document as unique, exact or near duplicate of an earlier one"""
+        index = len(self.sources)
+        ids = self.token_counter.encode_ids(text, self.model_name)
+        self.sources.append(source)
+        self.token_counts.append(len(ids))
+        
+        digest = hashlib.blake2b(" ".join(text.split()).encode('utf-8', errors='ignore'), digest_size=16).digest()
+        if digest in self._content_hashes:
+            return self._record('exact', self._content_hashes[digest], 1.0)
+        self._content_hashes[digest] = index
+        
+        signature = self._signature(ids)
+        band_keys = self._band_keys(signature)
+        candidates = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+        
+        if candidates:
+            rows = np.fromiter(candidates, dtype=np.int64)
+            similarity = (self._signatures[rows] == signature).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= self.threshold:
+                return self._record('near', self._unique_documents[rows[best]], float(similarity[best]))
+        
+        # New unique document: store its signature and index its bands
+        if self._unique_count == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        row = self._unique_count
+        self._signatures[row] = signature
+        self._unique_count += 1
+        self._unique_documents.append(index)
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(row)
+        return self._record('unique', None, None)
+    
+    def _record(self, status: str, duplicate_of: Optional[int], similarity: Optional[float]) -> Dict[str, Any]:
+        self.statuses.append(status)
+        self.duplicate_of.append(duplicate_of)
+        self.similarities.append(similarity)
+        return {'status': status, 'duplicate_of': duplicate_of, 'similarity': similarity}
+    
+    def report(self) -> pd.DataFrame:
+        """One row per document with its duplicate status"""
+        return pd.DataFrame({
+            'source': self.sources,
+            'tokens': self.token_counts,
+            'status': self.statuses,
+            'duplicate_of': [self.sources[i] if i is not None else None for i in self.duplicate_of],
+            'similarity': self.similarities,
+        })
+    
+    def totals(self) -> Dict[str, int]:
+        """Raw vs unique token totals across all documents"""
+        tokens = np.asarray(self.token_counts, dtype=np.int64)
+        statuses = np.asarray(self.statuses)
+        return {
+            'documents': len(tokens),
+            'exact_duplicates': int((statuses == 'exact').sum()),
+            'near_duplicates': int((statuses == 'near').sum()),
+            'raw_tokens': int(tokens.sum()),
+            'unique_tokens': int(tokens[statuses == 'unique'].sum()),
+        }
+
+def find_duplicates(roots: Iterable[Union[str, Path]], token_counter: 'TokenCounter', model_name: str,
+                    worker_pool: Optional['ExtractionWorkerPool'] = None, **kwargs) -> DuplicateDetector:
+    """Run every document under roots through a DuplicateDetector"""
+    detector = DuplicateDetector(token_counter, model_name, **kwargs)
+    for path, pages in iter_extracted_documents(roots, worker_pool):
+        try:
+            detector.add_document(str(path), "\n".join(page for page in pages if page))
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+    return detector
+
+class DocumentIndex:
+    """SQLite index of processed documents for incremental batch re-runs.
+    
+    Files are tracked by path with size/mtime for a stat-only fast path;
+    extraction metadata and per-encoding token counts are keyed by content
+    hash, so renamed or copied files are never extracted twice.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        last_seen INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash);
+    CREATE TABLE IF NOT EXISTS documents (
+        content_hash TEXT PRIMARY KEY,
+        file_type TEXT NOT NULL,
+        pages INTEGER NOT NULL,
+        characters INTEGER NOT NULL,
+        words INTEGER NOT NULL,
+        extracted_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS token_counts (
+        content_hash TEXT NOT NULL,
+        encoding TEXT NOT NULL,
+        tokens INTEGER NOT NULL,
+        PRIMARY KEY (content_hash, encoding)
+    );
+    """
+    
+    def __init__(self, db_path: Union[str, Path] = 'tokenforge_index.db'):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+    
+    @staticmethod
+    def hash_file(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+        """blake2b content hash, read in blocks so large files stay out of memory"""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _path_range(root: Union[str, Path]):
+        # root itself (a single-file root) plus everything under it, which sorts between
+        # 'root/' and 'root0' ('0' follows '/'), so the primary key index answers both
+        root = str(Path(root).resolve()).rstrip(os.sep)
+        return root, root + os.sep, root + chr(ord(os.sep) + 1)
+    
+    def lookup_file(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """Content hash for path if its size and mtime are unchanged since indexing"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def missing_encodings(self, content_hash: str, encodings: List[str]) -> List[str]:
+        """Encodings that have no stored count for this content"""
+        with self._lock:
+            known = {row[0] for row in self.conn.execute(
+                "SELECT encoding FROM token_counts WHERE content_hash = ?", (content_hash,)
+            )}
+        return [enc for enc in encodings if enc not in known]
+    
+    def record_files(self, rows: List[tuple]):
+        """Upsert (path, size, mtime_ns, content_hash, last_seen) rows"""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, last_seen) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    def touch_files(self, paths: List[str], run_id: int):
+        """Mark unchanged files as seen in this run"""
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE files SET last_seen = ? WHERE path = ?",
+                                  [(run_id, path) for path in paths])
+    
+    def record_document(self, content_hash: str, file_type: str, pages: List[str], counts: Dict[str, int]):
+        """Store extraction metadata and token counts for one piece of content"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, file_type, len(pages), sum(len(p) for p in pages),
+                 sum(len(p.split()) for p in pages), pd.Timestamp.now().isoformat())
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO token_counts VALUES (?, ?, ?)",
+                [(content_hash, enc, tokens) for enc, tokens in counts.items()]
+            )
+    
+    def remove_unseen(self, root: Union[str, Path], run_id: int) -> int:
+        """Drop files under root that were not seen in this run (deleted since last run),
+        then any content no file references any more (deleted or changed since indexing)"""
+        path, low, high = self._path_range(root)
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM files WHERE (path = ? OR (path >= ? AND path < ?)) AND last_seen != ?",
+                (path, low, high, run_id)
+            )
+            for table in ('documents', 'token_counts'):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM files f WHERE f.content_hash = {table}.content_hash)"
+                )
+        return cursor.rowcount
+    
+    def folder_totals(self, root: Union[str, Path]) -> pd.DataFrame:
+        """Files and token totals per encoding for everything indexed under root"""
+        path, low, high = self._path_range(root)
+        with self._lock:
+            return pd.read_sql_query(
+                """
+                SELECT t.encoding, COUNT(*) AS files, SUM(t.tokens) AS tokens,
+                       SUM(d.characters) AS characters, SUM(d.pages) AS pages
+                FROM files f
+                JOIN token_counts t ON t.content_hash = f.content_hash
+                JOIN documents d ON d.content_hash = f.content_hash
+                WHERE f.path = ? OR (f.path >= ? AND f.path < ?)
+                GROUP BY t.encoding
+                ORDER BY t.encoding
+                """,
+                self.conn, params=(path, low, high), index_col='encoding'
+            )
+    
+    def close(self):
+        self.conn.close()
+
+def index_folder(root: Union[str, Path], token_counter: 'TokenCounter', index: DocumentIndex,
+                 encodings: Optional[List[str]] = None, batch_size: int = 500,
+                 worker_pool: Optional['ExtractionWorkerPool'] = None) -> Dict[str, int]:
+    """Bring the index up to date for root, extracting only new or changed content"""
+    if not Path(root).exists():
+        # An unmounted share or a typo must not look like every indexed file was deleted
+        raise FileNotFoundError(f"Index root not found: {root}")
+    encodings = encodings or list(token_counter.get_available_tokenizers())
+    run_id = time.time_ns()
+    stats = {'scanned': 0, 'unchanged': 0, 'rehashed': 0, 'processed': 0, 'failed': 0, 'removed': 0}
+    unchanged, changed = [], []
+    
+    def flush():
+        index.touch_files(unchanged, run_id)
+        index.record_files(changed)
+        unchanged.clear()
+        changed.clear()
+    
+    for path in iter_document_files(root):
+        stats['scanned'] += 1
+        try:
+            path = path.resolve()
+            stat = path.stat()
+            content_hash = index.lookup_file(str(path), stat)
             
+            if content_hash and not index.missing_encodings(content_hash, encodings):
+                unchanged.append(str(path))
+                stats['unchanged'] += 1
             else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+                content_hash = content_hash or DocumentIndex.hash_file(path)
+                missing = index.missing_encodings(content_hash, encodings)
+                if missing:
+                    file_type = path.suffix.lstrip('.').lower()
+                    pages = extract_file_pages(path, worker_pool)
+                    text = "\n".join(page for page in pages if page)
+                    counts = {enc: token_counter.count_tokens(text, enc)['token_count'] for enc in missing}
+                    index.record_document(content_hash, file_type, pages, counts)
+                    stats['processed'] += 1
+                else:
+                    # Same content already indexed under another path or an older mtime
+                    stats['rehashed'] += 1
+                changed.append((str(path), stat.st_size, stat.st_mtime_ns, content_hash, run_id))
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+            stats['failed'] += 1
+        
+        if len(unchanged) + len(changed) >= batch_size:
+            flush()
+    
+    flush()
+    if stats['scanned']:
+        stats['removed'] = index.remove_unseen(root, run_id)
+    else:
+        logger.warning(f"No documents found under {root}; leaving its index entries in place")
+    return stats
+
+class TokenShardWriter:
+    """Stream token IDs into memory-mappable binary shards.
+    
+    Files written for ``prefix``:
+    - ``<prefix>_00000.bin``, ...: raw little-endian uint16 (vocab <= 65536) or
+      uint32 token IDs, documents stored back to back and never split across shards
+    - ``<prefix>.idx``: one (shard, start, length) record per document, appended as written
+    - ``<prefix>.sources.jsonl``: one JSON-encoded source name per document
+    - ``<prefix>.json``: manifest with encoding, dtypes and shard list, written on a
+      clean close only, so its presence marks a complete export
+    """
+    
+    INDEX_DTYPE = np.dtype([('shard', '<u4'), ('start', '<u8'), ('length', '<u4')])
+    
+    def __init__(self, prefix: Union[str, Path], token_counter: 'TokenCounter', encoding: str,
+                 shard_tokens: int = 1 << 28):
+        self.prefix = Path(prefix)
+        self.prefix.parent.mkdir(parents=True, exist_ok=True)
+        self.token_counter = token_counter
+        self.encoding = encoding
+        self.shard_tokens = shard_tokens
+        self.dtype = np.dtype('<u2') if token_counter.vocab_size(encoding) <= 1 << 16 else np.dtype('<u4')
+        
+        self.shards = []
+        self.documents = 0
+        self.total_tokens = 0
+        self._shard_file = None
+        self._shard_fill = 0
+        # A manifest left by an earlier export to this prefix would vouch for the new files
+        Path(f"{self.prefix}.json").unlink(missing_ok=True)
+        self._index_file = open(f"{self.prefix}.idx", 'wb')
+        self._sources_file = open(f"{self.prefix}.sources.jsonl", 'w', encoding='utf-8')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close(write_manifest=exc_type is None)
+    
+    def _open_shard(self):
+        if self._shard_file is not None:
+            self._shard_file.close()
+        name = f"{self.prefix.name}_{len(self.shards):05d}.bin"
+        self._shard_file = open(self.prefix.parent / name, 'wb')
+        self.shards.append({'file': name, 'tokens': 0})
+        self._shard_fill = 0
+    
+    def add_ids(self, source: str, ids: np.ndarray):
+        """Append one document's token IDs"""
+        if self._shard_file is None or (self._shard_fill and self._shard_fill + len(ids) > self.shard_tokens):
+            self._open_shard()
+        
+        self._shard_file.write(ids.astype(self.dtype, copy=False).tobytes())
+        record = np.array([(len(self.shards) - 1, self._shard_fill, len(ids))], dtype=self.INDEX_DTYPE)
+        self._index_file.write(record.tobytes())
+        self._sources_file.write(json.dumps(source) + "\n")
+        
+        self._shard_fill += len(ids)
+        self.shards[-1]['tokens'] = self._shard_fill
+        self.documents += 1
+        self.total_tokens += len(ids)
+    
+    def add_documents(self, sources: List[str], texts: List[str]):
+        """Batch-encode and append several documents"""
+        for source, ids in zip(sources, self.token_counter.encode_ids_batch(texts, self.encoding)):
+            self.add_ids(source, ids)
+    
+    def close(self, write_manifest: bool = True):
+        """Close all files and, unless the export failed, write the manifest"""
+        if self._index_file is None:
+            return
+        if self._shard_file is not None:
+            self._shard_file.close()
+        self._index_file.close()
+        self._sources_file.close()
+        self._index_file = None
+        if not write_manifest:
+            return
+        
+        manifest = {
+            'encoding': self.encoding,
+            'dtype': self.dtype.str,
+            'index_dtype': self.INDEX_DTYPE.descr,
+            'documents': self.documents,
+            'total_tokens': self.total_tokens,
+            'shards': self.shards,
+        }
+        # Written aside and renamed, so readers never see a half-written manifest
+        with open(f"{self.prefix}.json.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{self.prefix}.json.tmp", f"{self.prefix}.json")
+
+class TokenShardReader:
+    """Zero-copy access to shards written by TokenShardWriter via np.memmap"""
+    
+    def __init__(self, prefix: Union[str, Path]):
+        self.prefix = Path(prefix)
+        with open(f"{self.prefix}.json", encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.dtype = np.dtype(self.manifest['dtype'])
+        self.index = np.fromfile(f"{self.prefix}.idx", dtype=TokenShardWriter.INDEX_DTYPE)
+        self._shards = [None] * len(self.manifest['shards'])
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def shard(self, number: int) -> np.ndarray:
+        """Memory-map one shard (opened on first access)"""
+        if self._shards[number] is None:
+            shard = self.manifest['shards'][number]
+            path = self.prefix.parent / shard['file']
+            self._shards[number] = (np.memmap(path, dtype=self.dtype, mode='r', shape=(shard['tokens'],))
+                                    if shard['tokens'] else np.empty(0, dtype=self.dtype))
+        return self._shards[number]
+    
+    def __getitem__(self, document: int) -> np.ndarray:
+        shard, start, length = self.index[document]
+        return self.shard(int(shard))[int(start):int(start) + int(length)]
+    
+    def sources(self) -> List[str]:
+        with open(f"{self.prefix}.sources.jsonl", encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+def export_token_shards(roots: Iterable[Union[str, Path]], prefix: Union[str, Path],
+                        token_counter: 'TokenCounter', encoding: str, batch_documents: int = 64,
+                        shard_tokens: int = 1 << 28,
+                        worker_pool: Optional['ExtractionWorkerPool'] = None) -> Dict[str, Any]:
+    """Extract every document under roots and stream its token IDs into shards"""
+    def flush(writer, sources, texts):
+        try:
+            writer.add_documents(sources, texts)
+        except Exception:
+            # Nothing is written when a batch fails to encode; retry one by one to skip the culprit
+            for source, text in zip(sources, texts):
+                try:
+                    writer.add_documents([source], [text])
+                except Exception as e:
+                    logger.warning(f"Skipping {source}: {e}")
+    
+    with TokenShardWriter(prefix, token_counter, encoding, shard_tokens) as writer:
+        sources, texts = [], []
+        for path, pages in iter_extracted_documents(roots, worker_pool):
+            sources.append(str(path))
+            texts.append("\n".join(page for page in pages if page))
+            if len(texts) >= batch_documents:
+                flush(writer, sources, texts)
+                sources, texts = [], []
+        if texts:
+            flush(writer, sources, texts)
+    return {'documents': writer.documents, 'tokens': writer.total_tokens, 'shards': len(writer.shards)}
+
+class ArchiveProcessor:
+    """Stream documents out of ZIP and TAR archives without unpacking them to disk.
+    
+    Members are read one at a time (TAR archives in pure streaming mode, so
+    compressed tarballs are never seeked) and handed to a thread pool that
+    extracts and counts them. At most ``2 * max_workers`` members are held in
+    memory at once; members over ``max_member_bytes`` are not read and are
+    reported with status 'skipped'.
+    """
+    
+    ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+    
+    @staticmethod
+    def is_archive(name: str) -> bool:
+        return name.lower().endswith(ArchiveProcessor.ARCHIVE_SUFFIXES)
+    
+    @staticmethod
+    def _member_type(name: str) -> Optional[str]:
+        file_type = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+        return file_type if file_type in DocumentProcessor.SUPPORTED_TYPES else None
+    
+    @staticmethod
+    def iter_members(archive: Union[str, Path, BinaryIO], name: str,
+                     max_member_bytes: int = 256 << 20) -> Iterator[Tuple[str, str, Optional[bytes]]]:
+        """Yield (member name, file type, bytes) for each supported document in the archive.
+        
+        Members over max_member_bytes are yielded with None instead of their bytes.
+        """
+        if name.lower().endswith('.zip'):
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    file_type = ArchiveProcessor._member_type(info.filename)
+                    if info.is_dir() or not file_type:
+                        continue
+                    if info.file_size > max_member_bytes:
+                        logger.warning(f"Skipping {info.filename}: {info.file_size:,} bytes exceeds limit")
+                        yield info.filename, file_type, None
+                        continue
+                    with zf.open(info) as member:
+                        # Read one byte past the limit so a forged size header cannot inflate past it
+                        data = member.read(max_member_bytes + 1)
+                    if len(data) > max_member_bytes:
+                        logger.warning(f"Skipping {info.filename}: exceeds {max_member_bytes:,} bytes")
+                        yield info.filename, file_type, None
+                        continue
+                    yield info.filename, file_type, data
+        else:
+            if isinstance(archive, (str, Path)):
+                tf = tarfile.open(archive, mode='r|*')
+            else:
+                tf = tarfile.open(fileobj=archive, mode='r|*')
+            with tf:
+                for info in tf:
+                    file_type = ArchiveProcessor._member_type(info.name)
+                    if not info.isfile() or not file_type:
+                        continue
+                    if info.size > max_member_bytes:
+                        logger.warning(f"Skipping {info.name}: {info.size:,} bytes exceeds limit")
+                        yield info.name, file_type, None
+                        continue
+                    yield info.name, file_type, tf.extractfile(info).read()
+    
+    @staticmethod
+    def _process_member(member: str, file_type: str, data: bytes, token_counter: 'TokenCounter',
+                        model_names: List[str], ocr_mode: str,
+                        worker_pool: Optional['ExtractionWorkerPool']) -> Dict[str, Any]:
+        result = {'member': member, 'file_type': file_type, 'bytes': len(data), 'status': 'ok', 'error': None}
+        try:
+            if worker_pool is not None:
+                extraction = worker_pool.extract(data, file_type, ocr_mode)
+                result['status'], result['error'] = extraction['status'], extraction['error']
+                text = "\n".join(page for page in extraction['pages'] if page)
+            else:
+                text = DocumentProcessor.extract_text(data, file_type, ocr_mode)
+            result['characters'] = len(text)
+            for model_name in model_names:
+                result[model_name] = token_counter.count_tokens(text, model_name)['token_count']
+        except Exception as e:
+            result['status'], result['error'] = 'error', str(e)
+        return result
+    
+    @staticmethod
+    def process(archive: Union[str, Path, BinaryIO], name: str, token_counter: 'TokenCounter',
+                model_names: List[str], max_workers: Optional[int] = None, ocr_mode: str = 'accurate',
+                max_member_bytes: int = 256 << 20,
+                worker_pool: Optional['ExtractionWorkerPool'] = None) -> Iterator[Dict[str, Any]]:
+        """Extract and count every member in parallel, yielding results as they complete.
+        
+        With a worker_pool, extraction runs in its isolated processes (the
+        threads here just feed it) and partial results carry the failure status.
+        """
+        max_workers = max_workers or (worker_pool.workers if worker_pool else min(8, os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = set()
+            for member, file_type, data in ArchiveProcessor.iter_members(archive, name, max_member_bytes):
+                if data is None:
+                    yield {'member': member, 'file_type': file_type, 'bytes': None, 'status': 'skipped',
+                           'error': f"Larger than the {max_member_bytes:,}-byte member limit"}
+                    continue
+                pending.add(pool.submit(ArchiveProcessor._process_member, member, file_type, data,
+                                        token_counter, model_names, ocr_mode, worker_pool))
+                del data
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in pending:
+                yield future.result()
+
+def _extraction_worker(conn, memory_limit_mb: Optional[int]):
+    """Worker process loop: extract documents sent over conn, streaming pages back"""
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # Own process group, so a timeout also kills pdftoppm/tesseract children
+    if memory_limit_mb:
+        try:
+            import resource
+            # The limit is headroom on top of the address space inherited from the parent
+            try:
+                with open('/proc/self/statm') as f:
+                    inherited = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, ValueError):
+                inherited = 0
+            limit = inherited + (memory_limit_mb << 20)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"Could not apply worker memory limit: {e}")
+    
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        file_bytes, file_type, ocr_mode = job
+        try:
+            progress = lambda message: conn.send(('status', None, message))
+            for index, text in DocumentProcessor.iter_pages(file_bytes, file_type, ocr_mode, progress):
+                conn.send(('page', index, text))
+            conn.send(('done', None, None))
+        except MemoryError:
+            conn.send(('memory', None, 'Memory limit exceeded'))
+            break  # Heap state is suspect after a MemoryError; let the pool replace this worker
+        except Exception as e:
+            conn.send(('error', None, str(e)))
+
+class ExtractionWorkerPool:
+    """Run document extraction in isolated worker processes.
+    
+    Each job gets a wall-clock timeout and each worker an address-space limit of
+    ``memory_limit_mb`` beyond what it inherits at fork (also applied to the
+    poppler/tesseract processes it starts). Workers are
+    recycled after ``max_jobs_per_worker`` documents and replaced whenever
+    they time out, run out of memory or crash. Pages are streamed back as
+    they are extracted, so a failed job still returns the pages it finished.
+    
+    extract() is thread-safe: callers block until a worker is idle.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, timeout: float = 120.0,
+                 memory_limit_mb: Optional[int] = 2048, max_jobs_per_worker: int = 50):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        # fork keeps this working under `streamlit run`, whose script module cannot be re-imported by spawn
+        start_methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('fork' if 'fork' in start_methods else 'spawn')
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(self.workers):
+            self._idle.put(self._start_worker())
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+    
+    def _start_worker(self) -> Dict[str, Any]:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_extraction_worker, args=(child_conn, self.memory_limit_mb),
+                                        daemon=True)
+        process.start()
+        child_conn.close()
+        return {'process': process, 'conn': parent_conn, 'jobs': 0}
+    
+    @staticmethod
+    def _kill_worker(worker: Dict[str, Any]):
+        process = worker['process']
+        if process.is_alive():
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (AttributeError, ProcessLookupError, PermissionError):
+                process.kill()
+        process.join(timeout=5)
+        worker['conn'].close()
+    
+    @staticmethod
+    def _stop_worker(worker: Dict[str, Any]):
+        try:
+            worker['conn'].send(None)
+            worker['process'].join(timeout=5)
+        except (BrokenPipeError, OSError):
+            pass
+        ExtractionWorkerPool._kill_worker(worker)
+    
+    def extract(self, file_bytes: bytes, file_type: str, ocr_mode: str = 'accurate',
+                on_status: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Extract a document in a worker.
+        
+        Returns {'pages', 'status', 'error', 'seconds'} where status is 'ok',
+        'error', 'timeout', 'memory' or 'crashed'; pages holds whatever was
+        extracted before a failure. OCR status messages from the worker are
+        passed to on_status in the calling thread.
+        """
+        if self._closed:
+            raise RuntimeError("Extraction pool is closed")
         
+        worker = self._idle.get()
+        pages = {}
+        status, error = 'ok', None
+        start = time.monotonic()
+        deadline = start + self.timeout
+        healthy = True
+        
+        try:
+            worker['conn'].send((file_bytes, file_type, ocr_mode))
+            worker['jobs'] += 1
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker['conn'].poll(remaining):
+                    status, error = 'timeout', f"Extraction exceeded {self.timeout:.0f}s"
+                    healthy = False
+                    break
+                kind, index, payload = worker['conn'].recv()
+                if kind == 'page':
+                    pages[index] = payload
+                elif kind == 'status':
+                    if on_status:
+                        on_status(payload)
+                elif kind == 'done':
+                    break
+                else:
+                    status, error = kind, payload
+                    healthy = kind != 'memory'
+                    break
+        except (EOFError, OSError, BrokenPipeError):
+            worker['process'].join(timeout=1)  # exitcode is only set once the process is reaped
+            exitcode = worker['process'].exitcode
+            status = 'crashed'
+            error = f"Worker exited unexpectedly (exit code {exitcode})"
+            healthy = False
         finally:
-            if os.path.exists(file_path):
-                os.unlink(file_path)
+            if not healthy:
+                self._kill_worker(worker)
+                worker = self._start_worker()
+            elif worker['jobs'] >= self.max_jobs_per_worker:
+                self._stop_worker(worker)
+                worker = self._start_worker()
+            if self._closed:
+                self._stop_worker(worker)
+            else:
+                self._idle.put(worker)
+        
+        if status != 'ok':
+            logger.warning(f"Extraction {status}: {error} ({len(pages)} pages recovered)")
+        return {
+            'pages': [pages[i] for i in sorted(pages)],
+            'status': status,
+            'error': error,
+            'seconds': time.monotonic() - start,
+        }
+    
+    def close(self):
+        """Stop idle workers; busy workers are stopped when their job returns"""
+        self._closed = True
+        while True:
+            try:
+                self._stop_worker(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+# Published API list prices in USD per 1K tokens. output_ratio is the typical
+# completion size relative to the prompt; discounts are fractions taken off the
+# batch API price and off input tokens served from the prompt cache.
+PRICING_AS_OF = "2024-10"
+MODEL_PRICING = {
+    'gpt-4': {'input': 0.03, 'output': 0.06, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.0},
+    'gpt-4-turbo': {'input': 0.01, 'output': 0.03, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.0},
+    'gpt-4o': {'input': 0.0025, 'output': 0.01, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.5},
+    'gpt-4o-mini': {'input': 0.00015, 'output': 0.0006, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.5},
+    'gpt-3.5-turbo': {'input': 0.0005, 'output': 0.0015, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.0},
+    'text-davinci-003': {'input': 0.02, 'output': 0.02, 'output_ratio': 0.25, 'batch_discount': 0.0, 'cache_discount': 0.0},
+    'claude-3-opus': {'input': 0.015, 'output': 0.075, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.9},
+    'claude-3.5-sonnet': {'input': 0.003, 'output': 0.015, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.9},
+    'claude-3-haiku': {'input': 0.00025, 'output': 0.00125, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.9},
+    'gemini-1.5-pro': {'input': 0.00125, 'output': 0.005, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.75},
+    'gemini-1.5-flash': {'input': 0.000075, 'output': 0.0003, 'output_ratio': 0.25, 'batch_discount': 0.5, 'cache_discount': 0.75},
+}
+
+class PricingEngine:
+    """Vectorized cost projections across every priced model"""
+    
+    def __init__(self, pricing: Optional[Dict[str, Dict[str, float]]] = None):
+        pricing = pricing or MODEL_PRICING
+        self.models = list(pricing)
+        self.input_price = np.array([pricing[m]['input'] for m in self.models])
+        self.output_price = np.array([pricing[m]['output'] for m in self.models])
+        self.output_ratio = np.array([pricing[m]['output_ratio'] for m in self.models])
+        self.batch_discount = np.array([pricing[m]['batch_discount'] for m in self.models])
+        self.cache_discount = np.array([pricing[m]['cache_discount'] for m in self.models])
+    
+    def cost_matrix(self, document_counts, tokens_per_document, output_ratio: Optional[float] = None,
+                    batch: bool = False, cache_hit_rate: float = 0.0) -> np.ndarray:
+        """Return costs with shape (models, document_counts).
+        
+        tokens_per_document is a scalar or one value per model (token counts differ
+        between tokenizers); output_ratio overrides the per-model defaults.
+        """
+        documents = np.asarray(document_counts, dtype=np.float64)
+        tokens = np.broadcast_to(np.asarray(tokens_per_document, dtype=np.float64), self.input_price.shape)
+        ratio = self.output_ratio if output_ratio is None else np.full_like(self.output_ratio, output_ratio)
+        
+        input_price = self.input_price * (1.0 - cache_hit_rate * self.cache_discount)
+        per_document = tokens / 1000 * (input_price + ratio * self.output_price)
+        if batch:
+            per_document = per_document * (1.0 - self.batch_discount)
+        
+        return np.outer(per_document, documents)
+    
+    def project(self, document_counts, tokens_per_document, **kwargs) -> pd.DataFrame:
+        """Cost projection table indexed by model with one column per document count"""
+        document_counts = np.atleast_1d(document_counts)
+        costs = self.cost_matrix(document_counts, tokens_per_document, **kwargs)
+        return pd.DataFrame(costs, index=self.models, columns=[f"{int(n):,} docs" for n in document_counts])
 
 def apply_custom_css():
     """Apply custom CSS with subtle PRIDE-themed colors"""
@@ -438,6 +1760,46 @@ def apply_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
+def render_archive_results(uploaded_file, token_counter: TokenCounter, selected_model: str, ocr_mode: str,
+                           worker_pool: Optional[ExtractionWorkerPool] = None):
+    """Count every document inside an uploaded archive and show per-member results"""
+    with st.spinner("🔄 Streaming archive members..."):
+        results = list(ArchiveProcessor.process(uploaded_file, uploaded_file.name, token_counter,
+                                                [selected_model], ocr_mode=ocr_mode, worker_pool=worker_pool))
+    
+    if not results:
+        st.warning("No TXT, PDF or DOCX documents found in the archive.")
+        return
+    
+    df = pd.DataFrame(results).sort_values('member').reset_index(drop=True)
+    failed = (df['status'] != 'ok').sum()
+    total_tokens = int(df[selected_model].fillna(0).sum()) if selected_model in df else 0
+    st.success(f"✅ Processed {len(df):,} documents from {uploaded_file.name}")
+    
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    for column, value, label in (
+        (metric_col1, f"{total_tokens:,}", "Tokens"),
+        (metric_col2, f"{len(df) - failed:,}", "Documents"),
+        (metric_col3, f"{failed:,}", "Failed / Skipped"),
+    ):
+        with column:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{value}</div>
+                <div class="metric-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    st.dataframe(df, hide_index=True, use_container_width=True)
+    st.download_button(
+        "📊 Download CSV Report",
+        df.to_csv(index=False),
+        f"tokenforge_archive_{selected_model}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        "text/csv",
+        help="Download per-document token counts as CSV file",
+        use_container_width=True
+    )
+
 def main():
     st.set_page_config(
         page_title="TokenForge - Professional Token Counter",
@@ -471,6 +1833,36 @@ def main():
     def get_token_counter():
         return TokenCounter()
     
+    @st.cache_resource
+    def get_pricing_engine():
+        return PricingEngine()
+    
+    @st.cache_resource
+    def get_extraction_pool():
+        # Shared by every session; each document runs in an isolated, time- and memory-limited worker
+        return ExtractionWorkerPool(
+            timeout=float(os.environ.get('TOKENFORGE_EXTRACT_TIMEOUT', 120)),
+            memory_limit_mb=int(os.environ.get('TOKENFORGE_WORKER_MEMORY_MB', 2048))
+        )
+    
+    @st.cache_resource
+    def get_document_index():
+        return DocumentIndex(os.environ.get('TOKENFORGE_INDEX_PATH', 'tokenforge_index.db'))
+    
+    # Cached per text and model so widget changes rerun the script without re-tokenizing the document
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def get_vocabulary_analytics(text, model_name):
+        analyzer = VocabularyAnalyzer(get_token_counter())
+        analyzer.add_text(text)
+        return analyzer.summary(), analyzer.top_tokens(model_name)
+    
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def get_parquet_export(source, pages, model_name):
+        buffer = io.BytesIO()
+        with BatchResultWriter(buffer, get_token_counter(), [model_name]) as writer:
+            writer.add_document(source, pages)
+        return buffer.getvalue()
+    
     token_counter = get_token_counter()
     available_tokenizers = token_counter.get_available_tokenizers()
     
@@ -491,60 +1883,106 @@ def main():
             help="Choose the tokenizer that matches your target model"
         )
         
+        ocr_mode = st.radio(
+            "🔍 OCR Mode",
+            options=list(DocumentProcessor.OCR_PROFILES.keys()),
+            horizontal=True,
+            help="Fast renders at lower resolution for quick token estimates; accurate favours faithful text on scanned PDFs"
+        )
+        
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Cost estimation section
         st.markdown('<div class="custom-card">', unsafe_allow_html=True)
         st.markdown("### 💰 Cost Estimation")
         
+        st.session_state.setdefault('input_cost', 0.0)
+        st.session_state.setdefault('output_cost', 0.0)
+        
         col_cost1, col_cost2 = st.columns(2)
         with col_cost1:
             input_cost = st.number_input(
                 "Input ($/1K tokens)",
                 min_value=0.0,
-                value=0.0,
                 step=0.001,
                 format="%.6f",
+                key="input_cost",
                 help="Cost per 1000 input tokens"
             )
         with col_cost2:
             output_cost = st.number_input(
                 "Output ($/1K tokens)",
                 min_value=0.0,
-                value=0.0,
                 step=0.001,
                 format="%.6f",
+                key="output_cost",
                 help="Cost per 1000 output tokens"
             )
         
-        # Pricing presets with enhanced buttons
-        st.markdown("#### 🎯 Quick Presets")
-        col_preset1, col_preset2 = st.columns(2)
-        
-        with col_preset1:
-            if st.button("GPT-4", help="Set GPT-4 pricing", use_container_width=True):
-                st.session_state.input_cost = 0.03
-                st.session_state.output_cost = 0.06
-                st.rerun()
+        # Pricing presets from the pricing table (applied before the inputs re-render)
+        def apply_pricing_preset():
+            preset = MODEL_PRICING[st.session_state.pricing_preset]
+            st.session_state.input_cost = preset['input']
+            st.session_state.output_cost = preset['output']
         
-        with col_preset2:
-            if st.button("GPT-3.5", help="Set GPT-3.5 pricing", use_container_width=True):
-                st.session_state.input_cost = 0.001
-                st.session_state.output_cost = 0.002
-                st.rerun()
+        st.markdown("#### 🎯 Quick Presets")
+        st.selectbox(
+            "Model pricing",
+            options=list(MODEL_PRICING.keys()),
+            index=None,
+            placeholder="Choose a model...",
+            key="pricing_preset",
+            on_change=apply_pricing_preset,
+            help=f"List prices as of {PRICING_AS_OF}"
+        )
         
         st.markdown("</div>", unsafe_allow_html=True)
         
+        # Folder index for incremental batch counts. Every session shares the server's filesystem,
+        # so the card only appears when TOKENFORGE_INDEX_ROOTS lists the folders it may index
+        index_roots = [Path(root).resolve() for root in
+                       os.environ.get('TOKENFORGE_INDEX_ROOTS', '').split(os.pathsep) if root]
+        if index_roots:
+            st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+            st.markdown("### 🗂️ Folder Index")
+            
+            folder_path = st.text_input(
+                "Folder path",
+                placeholder=str(index_roots[0]),
+                help="Index a folder under " + ", ".join(str(root) for root in index_roots)
+                     + "; re-runs only process new or changed files"
+            )
+            if folder_path:
+                folder = Path(folder_path).resolve()
+                if not any(folder == root or root in folder.parents for root in index_roots):
+                    st.error("❌ Folder is outside the allowed index roots")
+                else:
+                    document_index = get_document_index()
+                    if st.button("Update Index", use_container_width=True):
+                        try:
+                            with st.spinner("🔄 Indexing folder..."):
+                                stats = index_folder(folder, token_counter, document_index,
+                                                     worker_pool=get_extraction_pool())
+                            st.success(f"✅ {stats['processed']:,} processed, {stats['unchanged']:,} unchanged, "
+                                       f"{stats['removed']:,} removed")
+                        except FileNotFoundError as e:
+                            st.error(f"❌ {e}")
+                    folder_totals = document_index.folder_totals(folder)
+                    if not folder_totals.empty:
+                        st.dataframe(folder_totals[['files', 'tokens']], use_container_width=True)
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+        
         # Feature highlights
         st.markdown('<div class="custom-card">', unsafe_allow_html=True)
         st.markdown("### ✨ Features")
         features = [
             "🎯 **Authentic Tokenizers** - Real OpenAI tiktoken",
-            "📄 **Multi-Format Support** - PDF, DOCX, TXT",
+            "📄 **Multi-Format Support** - PDF, DOCX, TXT, ZIP/TAR archives",
             "🔍 **OCR Processing** - Scanned document support", 
             "💰 **Cost Calculation** - Accurate API pricing",
             "📊 **Detailed Analytics** - Token breakdown",
-            "📥 **Export Options** - CSV and TXT formats"
+            "📥 **Export Options** - CSV, TXT and Parquet formats"
         ]
         
         for feature in features:
@@ -562,8 +2000,8 @@ def main():
         # Enhanced file upload
         uploaded_file = st.file_uploader(
             "📎 Upload Document",
-            type=['txt', 'pdf', 'docx'],
-            help="Supported formats: TXT, PDF, DOCX (including scanned PDFs with OCR)",
+            type=['txt', 'pdf', 'docx', 'zip', 'tar', 'gz', 'tgz', 'bz2', 'xz'],
+            help="Supported formats: TXT, PDF, DOCX (including scanned PDFs with OCR), or ZIP/TAR archives of them",
             label_visibility="collapsed"
         )
         
@@ -607,16 +2045,39 @@ def main():
         
         # Process input
         text = ""
+        pages = []
         source = ""
         total_cost = 0.0  # Initialize to prevent unbound variable error
         
-        if uploaded_file:
+        archive_uploaded = bool(uploaded_file) and ArchiveProcessor.is_archive(uploaded_file.name)
+        
+        if archive_uploaded:
+            try:
+                render_archive_results(uploaded_file, token_counter, selected_model, ocr_mode,
+                                       get_extraction_pool())
+            except Exception as e:
+                st.error(f"❌ Error processing archive: {e}")
+        
+        elif uploaded_file:
             try:
                 file_type = uploaded_file.name.split('.')[-1].lower()
+                if file_type not in DocumentProcessor.SUPPORTED_TYPES:
+                    # gz/bz2/xz are accepted for .tar.* archives; a single compressed file is not
+                    raise ValueError(f"{uploaded_file.name} is not a TAR archive. Upload the document "
+                                     f"uncompressed or bundle it as .tar.gz, .tar.bz2 or .tar.xz")
+                extraction_status = st.empty()
                 with st.spinner("🔄 Extracting text from document..."):
-                    text = DocumentProcessor.extract_text(uploaded_file.getvalue(), file_type)
+                    extraction = get_extraction_pool().extract(uploaded_file.getvalue(), file_type, ocr_mode,
+                                                               on_status=extraction_status.info)
+                    pages = extraction['pages']
+                    text = "\n".join(page for page in pages if page)
                 source = uploaded_file.name
-                st.success(f"✅ Successfully extracted text from {uploaded_file.name}")
+                if extraction['status'] == 'ok':
+                    st.success(f"✅ Successfully extracted text from {uploaded_file.name}")
+                elif text:
+                    st.warning(f"⚠️ Partial extraction ({len(pages)} pages): {extraction['error']}")
+                else:
+                    raise RuntimeError(extraction['error'])
             except Exception as e:
                 st.error(f"❌ Error processing file: {e}")
                 st.markdown("</div>", unsafe_allow_html=True)
@@ -624,6 +2085,7 @@ def main():
         
         elif text_input:
             text = text_input
+            pages = [text_input]
             source = "Direct input"
         
         if text:
@@ -687,6 +2149,24 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
                 
+                # Spend projection across every priced model
+                with st.expander("📅 Monthly Spend Projection", expanded=False):
+                    proj_col1, proj_col2 = st.columns(2)
+                    with proj_col1:
+                        use_batch = st.checkbox("Batch API pricing", help="Apply each provider's batch discount")
+                    with proj_col2:
+                        cache_hit_rate = st.slider("Prompt cache hit rate", 0.0, 1.0, 0.0, 0.05)
+                    
+                    projection = get_pricing_engine().project(
+                        [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+                        token_count,
+                        batch=use_batch,
+                        cache_hit_rate=cache_hit_rate
+                    )
+                    st.dataframe(projection.style.format("${:,.2f}"), use_container_width=True)
+                    st.caption(f"Assumes {token_count:,} input tokens per document and each model's typical output ratio. "
+                               f"Prices as of {PRICING_AS_OF}.")
+                
                 # Text preview with enhanced styling
                 with st.expander("📖 Text Preview", expanded=False):
                     preview = text[:2000] + "..." if len(text) > 2000 else text
@@ -719,16 +2199,24 @@ def main():
                     if 'tokens' in result and len(result['tokens']) > 0:
                         st.markdown("**🔤 First 20 Tokens Preview:**")
                         first_tokens = result['tokens'][:20]
-                        if result['tokenizer_type'] == 'tiktoken':
-                            # Decode tiktoken tokens
-                            tokenizer = token_counter.tokenizers[selected_model]
-                            decoded = [tokenizer.decode([t]).replace('\n', '\\n') for t in first_tokens]
-                            
-                            # Display tokens in a nice format
-                            token_display = " | ".join([f"`{token}`" for token in decoded])
-                            st.markdown(f"<div style='font-family: monospace; padding: 1rem; background: var(--bg-accent); border-radius: 8px; overflow-x: auto;'>{token_display}</div>", unsafe_allow_html=True)
-                        else:
-                            st.code(str(first_tokens))
+                        decoded = [token_counter.decode_token(t, selected_model).replace('\n', '\\n') for t in first_tokens]
+                        
+                        # Display tokens in a nice format
+                        token_display = " | ".join([f"`{token}`" for token in decoded])
+                        st.markdown(f"<div style='font-family: monospace; padding: 1rem; background: var(--bg-accent); border-radius: 8px; overflow-x: auto;'>{token_display}</div>", unsafe_allow_html=True)
+                    
+                    if st.checkbox("📚 Vocabulary analytics", help="Token-ID frequency and compression across every encoding"):
+                        vocabulary_summary, top_tokens = get_vocabulary_analytics(text, selected_model)
+                        st.markdown("**Compression by Encoding:**")
+                        st.dataframe(vocabulary_summary.style.format({
+                            'vocab_coverage': "{:.2%}",
+                            'chars_per_token': "{:.2f}",
+                            'bytes_per_token': "{:.2f}",
+                            'rare_token_rate': "{:.2%}"
+                        }), use_container_width=True)
+                        st.markdown(f"**Top Tokens ({selected_model}):**")
+                        st.dataframe(top_tokens.style.format({'share': "{:.2%}"}),
+                                     hide_index=True, use_container_width=True)
                 
                 st.markdown("</div>", unsafe_allow_html=True)
                 
@@ -752,7 +2240,7 @@ def main():
                     export_data['cost_per_token'] = input_cost / 1000
                 
                 # Enhanced export buttons
-                export_col1, export_col2 = st.columns(2)
+                export_col1, export_col2, export_col3 = st.columns(3)
                 
                 with export_col1:
                     # CSV export
@@ -810,6 +2298,17 @@ Professional Token Analysis Tool
                         use_container_width=True
                     )
                 
+                with export_col3:
+                    # Columnar export with per-page and per-chunk counts
+                    st.download_button(
+                        "🧱 Download Parquet",
+                        get_parquet_export(source, pages, selected_model),
+                        f"tokenforge_counts_{selected_model}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                        "application/vnd.apache.parquet",
+                        help="Download per-document, per-page and per-chunk token counts as Parquet",
+                        use_container_width=True
+                    )
+                
                 st.markdown("</div>", unsafe_allow_html=True)
                 
             except Exception as e:
@@ -822,7 +2321,7 @@ Professional Token Analysis Tool
                 """, unsafe_allow_html=True)
                 st.error(traceback.format_exc())
         
-        else:
+        elif not archive_uploaded:
             # Enhanced empty state
             st.markdown("""
             <div class="info-box" style="text-align: center; padding: 3rem;">
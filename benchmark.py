@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+TokenForge - Extraction Benchmarks
+Speed/accuracy trade-offs of the extraction paths, measured on the bundled samples
+"""
+
+import argparse
+import difflib
+import multiprocessing
+import resource
+import sys
+import tempfile
+import textwrap
+import time
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import docx
+import pdfplumber
+from PIL import Image, ImageDraw, ImageFont
+
+from app import DocumentProcessor, TokenCounter
+
+SAMPLES = [Path(__file__).parent / 'sample.txt', Path(__file__).parent / 'test-sample.txt']
+
+def render_scanned_pdf(text, pdf_path, dpi=200):
+    """Render text onto US Letter page images and save them as an image-only PDF"""
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    margin = dpi
+    font_size = dpi // 6  # ~12pt
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    line_height = int(font_size * 1.4)
+    chars_per_line = int((width - 2 * margin) / (font_size * 0.55))
+    lines = []
+    for paragraph in text.splitlines():
+        lines.extend(textwrap.wrap(paragraph, chars_per_line) or [""])
+    lines_per_page = (height - 2 * margin) // line_height
+
+    pages = []
+    for start in range(0, len(lines), lines_per_page):
+        page = Image.new('L', (width, height), 245)
+        draw = ImageDraw.Draw(page)
+        for i, line in enumerate(lines[start:start + lines_per_page]):
+            draw.text((margin, margin + i * line_height), line, fill=20, font=font)
+        pages.append(page.convert('RGB'))
+
+    pages[0].save(pdf_path, save_all=True, append_images=pages[1:], resolution=dpi)
+
+def text_accuracy(reference, extracted):
+    """Word-level similarity between reference and extracted text (0-1)"""
+    return difflib.SequenceMatcher(None, reference.split(), extracted.split(), autojunk=False).ratio()
+
+def benchmark_ocr(args):
+    """Compare OCR profiles on scanned renderings of the bundled samples"""
+    token_counter = TokenCounter()
+    encoding = 'cl100k_base' if 'cl100k_base' in token_counter.tokenizers else None
+
+    print("🔍 OCR profile benchmark")
+    print(f"{'sample':<18} {'mode':<10} {'pages':>5} {'seconds':>8} {'s/page':>7} {'accuracy':>9} {'token err':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for sample in SAMPLES:
+            reference = sample.read_text(encoding='utf-8')
+            pdf_path = str(Path(tmp_dir) / f"{sample.stem}.pdf")
+            render_scanned_pdf(reference, pdf_path)
+            with pdfplumber.open(pdf_path) as pdf:
+                page_sizes = [(float(page.width), float(page.height)) for page in pdf.pages]
+
+            for mode in DocumentProcessor.OCR_PROFILES:
+                best = float('inf')
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    pages = DocumentProcessor.ocr_pdf(pdf_path, page_sizes, mode)
+                    best = min(best, time.perf_counter() - start)
+
+                extracted = "\n".join(pages)
+                token_error = "n/a"
+                if encoding:
+                    expected = token_counter.count_tokens(reference, encoding)['token_count']
+                    actual = token_counter.count_tokens(extracted, encoding)['token_count']
+                    token_error = f"{(actual - expected) / expected:+.1%}"
+
+                print(f"{sample.name:<18} {mode:<10} {len(pages):>5} {best:>8.2f} {best / len(pages):>7.2f} "
+                      f"{text_accuracy(reference, extracted):>9.1%} {token_error:>10}")
+
+DOCX_PACKAGE = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>'
+        '<Override PartName="/word/footer1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml"/>'
+        '<Override PartName="/word/footnotes.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+        '</Relationships>'
+    ),
+    'word/_rels/document.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer" Target="footer1.xml"/>'
+        '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/footnotes" Target="footnotes.xml"/>'
+        '</Relationships>'
+    ),
+    'word/header1.xml': '<w:hdr {ns}><w:p><w:r><w:t>Confidential - Master Services Agreement</w:t></w:r></w:p></w:hdr>',
+    'word/footer1.xml': '<w:ftr {ns}><w:p><w:r><w:t>Page footer</w:t></w:r></w:p></w:ftr>',
+    'word/footnotes.xml': (
+        '<w:footnotes {ns}><w:footnote w:id="1"><w:p><w:r>'
+        '<w:t>Footnote: terms defined in Schedule A apply throughout.</w:t></w:r></w:p></w:footnote></w:footnotes>'
+    ),
+}
+WORD_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def build_large_docx(text, docx_path, size_mb):
+    """Write a DOCX whose document.xml is roughly size_mb of paragraphs and tables, streaming into the zip"""
+    paragraphs = [p for p in text.splitlines() if p.strip()]
+    target = size_mb << 20
+    written = 0
+
+    with zipfile.ZipFile(docx_path, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, content in DOCX_PACKAGE.items():
+            package.writestr(name, content.replace('{ns}', WORD_NS))
+
+        with package.open('word/document.xml', 'w', force_zip64=True) as f:
+            f.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {WORD_NS}><w:body>'.encode())
+            block = 0
+            while written < target:
+                chunk = []
+                for paragraph in paragraphs:
+                    chunk.append(f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>')
+                # One small table per block of paragraphs
+                cells = ''.join(f'<w:tc><w:p><w:r><w:t>Clause {block}.{i}</w:t></w:r></w:p></w:tc>' for i in range(4))
+                chunk.append(f'<w:tbl><w:tr>{cells}</w:tr></w:tbl>')
+                data = ''.join(chunk).encode()
+                f.write(data)
+                written += len(data)
+                block += 1
+            f.write(b'<w:sectPr/></w:body></w:document>')
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB on Linux
+
+def _run_docx_extractor(name, docx_path):
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if name == 'python-docx':
+        text = "\n".join(para.text for para in docx.Document(docx_path).paragraphs)
+    else:
+        text = DocumentProcessor.extract_docx(docx_path)
+    return time.perf_counter() - start, len(text), _peak_rss_mb() - baseline
+
+def benchmark_docx(args):
+    """Compare python-docx against the streaming DOCX extractor on a large generated document"""
+    reference = SAMPLES[0].read_text(encoding='utf-8')
+    print(f"📄 DOCX extraction benchmark (~{args.size_mb} MB document.xml)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        docx_path = str(Path(tmp_dir) / 'large.docx')
+        build_large_docx(reference, docx_path, args.size_mb)
+        print(f"   package size: {Path(docx_path).stat().st_size / (1 << 20):.1f} MB")
+        print(f"{'extractor':<12} {'seconds':>8} {'characters':>12} {'peak RSS +MB':>13}")
+
+        # Each extractor runs in a fresh process; peak RSS is reported above that process's import baseline
+        context = multiprocessing.get_context('spawn')
+        for name in ('python-docx', 'streaming'):
+            with context.Pool(1) as pool:
+                seconds, characters, peak = pool.apply(_run_docx_extractor, (name, docx_path))
+            print(f"{name:<12} {seconds:>8.2f} {characters:>12,} {peak:>13.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="TokenForge extraction benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    ocr_parser = subparsers.add_parser('ocr', help="Compare fast and accurate OCR profiles")
+    ocr_parser.add_argument('--repeat', type=int, default=1, help="Runs per profile (best time is reported)")
+    ocr_parser.set_defaults(func=benchmark_ocr)
+
+    docx_parser = subparsers.add_parser('docx', help="Compare python-docx with the streaming DOCX extractor")
+    docx_parser.add_argument('--size-mb', type=int, default=100, help="Uncompressed document.xml size to generate")
+    docx_parser.set_defaults(func=benchmark_docx)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
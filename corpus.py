@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+TokenForge - Corpus Tools
+Batch jobs over folders of documents, run from the command line
+"""
+
+import argparse
+import os
+import sys
+
+from app import (BatchResultWriter, DocumentIndex, ExtractionWorkerPool, TokenCounter, analyze_vocabulary,
+                 export_batch_results, export_token_shards, find_duplicates, index_folder)
+
+def run_dedup(args, token_counter, worker_pool):
+    """Report exact and near duplicates with raw vs unique token totals"""
+    detector = find_duplicates(args.roots, token_counter, args.model, worker_pool=worker_pool,
+                               shingle_size=args.shingle_size, num_perm=args.num_perm,
+                               bands=args.bands, threshold=args.threshold)
+    totals = detector.totals()
+    saved = totals['raw_tokens'] - totals['unique_tokens']
+
+    print(f"🔍 Duplicate report ({args.model})")
+    print(f"   documents:        {totals['documents']:>14,}")
+    print(f"   exact duplicates: {totals['exact_duplicates']:>14,}")
+    print(f"   near duplicates:  {totals['near_duplicates']:>14,}")
+    print(f"   raw tokens:       {totals['raw_tokens']:>14,}")
+    print(f"   unique tokens:    {totals['unique_tokens']:>14,}")
+    if totals['raw_tokens']:
+        print(f"   duplicate share:  {saved / totals['raw_tokens']:>14.1%}")
+
+    if args.report:
+        detector.report().to_csv(args.report, index=False)
+        print(f"📄 Per-document report written to {args.report}")
+
+def run_shards(args, token_counter, worker_pool):
+    """Export token IDs as memory-mappable shards for training pipelines"""
+    stats = export_token_shards(args.roots, args.prefix, token_counter, args.model,
+                                batch_documents=args.batch_documents, shard_tokens=args.shard_tokens,
+                                worker_pool=worker_pool)
+    print(f"🧱 Wrote {stats['documents']:,} documents / {stats['tokens']:,} {args.model} tokens "
+          f"into {stats['shards']:,} shards")
+    print(f"📄 Manifest: {args.prefix}.json")
+
+def run_export(args, token_counter, worker_pool):
+    """Write per-document, per-page and per-chunk token counts to Parquet or Arrow"""
+    documents = export_batch_results(args.roots, args.output, token_counter, args.encodings,
+                                     file_format=args.format, chunk_chars=args.chunk_chars,
+                                     worker_pool=worker_pool)
+    encodings = ", ".join(args.encodings or token_counter.get_available_tokenizers())
+    print(f"📊 Exported {documents:,} documents ({encodings}) to {args.output}")
+
+def run_vocab(args, token_counter, worker_pool):
+    """Print vocabulary usage per encoding and each encoding's most frequent tokens"""
+    analyzer = analyze_vocabulary(args.roots, token_counter, args.encodings, worker_pool=worker_pool)
+    print(f"🔤 Vocabulary report ({analyzer.documents:,} documents, {analyzer.characters:,} characters)")
+    print(analyzer.summary(rare_threshold=args.rare_threshold).to_string(formatters={
+        'tokens': '{:,}'.format,
+        'distinct_tokens': '{:,}'.format,
+        'vocab_coverage': '{:.1%}'.format,
+        'chars_per_token': '{:.2f}'.format,
+        'bytes_per_token': '{:.2f}'.format,
+        'rare_token_rate': '{:.2%}'.format,
+    }))
+
+    for encoding in analyzer.encodings:
+        top = analyzer.top_tokens(encoding, args.top)
+        # repr() keeps whitespace and control-character tokens visible on one line
+        top['token'] = top['token'].map(repr)
+        print(f"\n🏆 Top {len(top)} tokens ({encoding})")
+        print(top.to_string(index=False, formatters={'count': '{:,}'.format, 'share': '{:.2%}'.format}))
+
+def run_index(args, token_counter, worker_pool):
+    """Bring the incremental folder index up to date and print its totals"""
+    index = DocumentIndex(args.db)
+    try:
+        for root in args.roots:
+            try:
+                stats = index_folder(root, token_counter, index, args.encodings, worker_pool=worker_pool)
+            except FileNotFoundError as e:
+                print(f"❌ {e}")
+                continue
+            print(f"🗂️ {root}: {stats['scanned']:,} scanned, {stats['processed']:,} processed, "
+                  f"{stats['unchanged']:,} unchanged, {stats['rehashed']:,} rehashed, "
+                  f"{stats['failed']:,} failed, {stats['removed']:,} removed")
+            totals = index.folder_totals(root)
+            if not totals.empty:
+                print(totals.to_string())
+    finally:
+        index.close()
+    print(f"📄 Index: {args.db}")
+
+def main():
+    parser = argparse.ArgumentParser(description="TokenForge corpus tools")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction worker processes")
+    parser.add_argument('--timeout', type=float, default=120, help="Per-document extraction timeout in seconds")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    dedup_parser = subparsers.add_parser('dedup', help="Find exact and near-duplicate documents")
+    dedup_parser.add_argument('roots', nargs='+', help="Folders or files to scan")
+    dedup_parser.add_argument('--model', default='cl100k_base', help="Tokenizer used for shingles and totals")
+    dedup_parser.add_argument('--threshold', type=float, default=0.8, help="MinHash similarity for near duplicates")
+    dedup_parser.add_argument('--shingle-size', type=int, default=5, help="Tokens per shingle")
+    dedup_parser.add_argument('--num-perm', type=int, default=128, help="MinHash permutations")
+    dedup_parser.add_argument('--bands', type=int, default=16, help="LSH bands (must divide --num-perm)")
+    dedup_parser.add_argument('--report', help="Write one row per document with its duplicate status to this CSV")
+    dedup_parser.set_defaults(func=run_dedup)
+
+    shards_parser = subparsers.add_parser('shards', help="Export token IDs as memory-mappable shards")
+    shards_parser.add_argument('roots', nargs='+', help="Folders or files to export")
+    shards_parser.add_argument('--prefix', required=True, help="Output prefix, e.g. out/corpus")
+    shards_parser.add_argument('--model', default='cl100k_base', help="Tokenizer used to encode the documents")
+    shards_parser.add_argument('--shard-tokens', type=int, default=1 << 28, help="Maximum tokens per shard")
+    shards_parser.add_argument('--batch-documents', type=int, default=64, help="Documents encoded per batch")
+    shards_parser.set_defaults(func=run_shards)
+
+    export_parser = subparsers.add_parser('export', help="Export token counts per document, page and chunk")
+    export_parser.add_argument('roots', nargs='+', help="Folders or files to export")
+    export_parser.add_argument('--output', required=True, help="Output file, e.g. counts.parquet")
+    export_parser.add_argument('--format', choices=BatchResultWriter.FORMATS, default='parquet',
+                               help="Parquet (zstd) or Arrow IPC file")
+    export_parser.add_argument('--chunk-chars', type=int, default=4000, help="Maximum characters per chunk row")
+    export_parser.add_argument('--encodings', nargs='+', help="Tokenizers to count with (default: all available)")
+    export_parser.set_defaults(func=run_export)
+
+    vocab_parser = subparsers.add_parser('vocab', help="Summarize vocabulary usage and top tokens per encoding")
+    vocab_parser.add_argument('roots', nargs='+', help="Folders or files to analyze")
+    vocab_parser.add_argument('--encodings', nargs='+', help="Tokenizers to compare (default: all available)")
+    vocab_parser.add_argument('--top', type=int, default=20, help="Most frequent tokens listed per encoding")
+    vocab_parser.add_argument('--rare-threshold', type=int, default=5,
+                              help="Tokens seen at most this often count as rare")
+    vocab_parser.set_defaults(func=run_vocab)
+
+    index_parser = subparsers.add_parser('index', help="Incrementally index folders into the SQLite document index")
+    index_parser.add_argument('roots', nargs='+', help="Folders or files to index")
+    index_parser.add_argument('--db', default=os.environ.get('TOKENFORGE_INDEX_PATH', 'tokenforge_index.db'),
+                              help="Index database (default: $TOKENFORGE_INDEX_PATH, as used by the app)")
+    index_parser.add_argument('--encodings', nargs='+', help="Tokenizers to count with (default: all available)")
+    index_parser.set_defaults(func=run_index)
+
+    args = parser.parse_args()
+
+    token_counter = TokenCounter()
+    available = token_counter.get_available_tokenizers()
+    requested = [args.model] if hasattr(args, 'model') else (args.encodings or [])
+    missing = [name for name in requested if name not in available]
+    if missing:
+        print(f"❌ Tokenizer {', '.join(missing)} not available")
+        return 1
+
+    with ExtractionWorkerPool(workers=args.workers, timeout=args.timeout) as worker_pool:
+        args.func(args, token_counter, worker_pool)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+TokenForge - Load Test Harness
+Simulates concurrent sessions and writes a capacity report that can be re-run after changes
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import docx
+import numpy as np
+
+from app import ArchiveProcessor, ExtractionWorkerPool, TokenCounter
+
+try:
+    import psutil  # Optional: live RSS sampling of the app and its worker processes
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).parent
+SAMPLES = [ROOT / 'sample.txt', ROOT / 'test-sample.txt']
+
+def load_documents():
+    """The repo's sample documents as uploads: each TXT, a DOCX of sample.txt and a ZIP of both"""
+    documents = [(path.name, 'txt', path.read_bytes()) for path in SAMPLES]
+
+    doc = docx.Document()
+    for paragraph in SAMPLES[0].read_text(encoding='utf-8').splitlines():
+        doc.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    documents.append(('sample.docx', 'docx', buffer.getvalue()))
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in SAMPLES:
+            archive.write(path, path.name)
+    documents.append(('samples.zip', 'zip', buffer.getvalue()))
+    return documents
+
+class ResourceMonitor(threading.Thread):
+    """Track CPU time and peak RSS of this process and its worker processes"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss = 0
+        self._done = threading.Event()
+
+    def _rss(self):
+        if psutil is None:
+            # Peak only: ru_maxrss is KiB on Linux, bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+            return own + children
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _cpu_seconds(self):
+        if psutil is None:
+            # Reaped children only report once, so without psutil count the app process alone
+            times = os.times()
+            return times.user + times.system
+        process = psutil.Process()
+        total = sum(process.cpu_times()[:2])
+        for child in process.children(recursive=True):
+            try:
+                total += sum(child.cpu_times()[:2])
+            except psutil.Error:
+                pass
+        return total
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self._rss())
+
+    def __enter__(self):
+        self.peak_rss = self._rss()
+        self._cpu_start = self._cpu_seconds()
+        self._wall_start = time.perf_counter()
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._done.set()
+        self.join()
+        self.peak_rss = max(self.peak_rss, self._rss())
+        wall = time.perf_counter() - self._wall_start
+        self.cpu_percent = 100 * (self._cpu_seconds() - self._cpu_start) / wall / (os.cpu_count() or 1)
+
+def pipeline_session(session, iterations, documents, token_counter, worker_pool, model_name):
+    """One simulated session uploading documents through the app's extraction and counting path"""
+    timings = []
+    for i in range(iterations):
+        name, file_type, data = documents[(session + i) % len(documents)]
+        timing = {'document': name, 'error': None}
+        try:
+            start = time.perf_counter()
+            if file_type == 'zip':
+                members = list(ArchiveProcessor.process(io.BytesIO(data), name, token_counter, [model_name],
+                                                        worker_pool=worker_pool))
+                timing['extract'] = time.perf_counter() - start
+                timing['count'] = None  # Counted inside the archive pipeline, so only extract/total apply
+                if any(member['status'] != 'ok' for member in members):
+                    timing['error'] = 'archive member failed'
+            else:
+                extraction = worker_pool.extract(data, file_type, 'fast')
+                timing['extract'] = time.perf_counter() - start
+                if extraction['status'] != 'ok':
+                    timing['error'] = extraction['error']
+                text = "\n".join(page for page in extraction['pages'] if page)
+                start = time.perf_counter()
+                token_counter.count_tokens(text, model_name)
+                timing['count'] = time.perf_counter() - start
+        except Exception as e:
+            timing.setdefault('extract', None)
+            timing.setdefault('count', None)
+            timing['error'] = str(e)
+        timing['total'] = sum(timing[stage] or 0.0 for stage in ('extract', 'count'))
+        timings.append(timing)
+    return timings
+
+def app_session(session, iterations, documents, model_name, timeout):
+    """One simulated browser session driving app.py with Streamlit's AppTest.
+
+    AppTest cannot drive the file uploader, so sessions paste the sample text;
+    only the total is recorded: a full script rerun (counting plus rendering).
+    The app catches analysis failures and shows them with st.error, so those
+    count as errors alongside uncaught exceptions.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    text_documents = [(name, data.decode('utf-8')) for name, file_type, data in documents if file_type == 'txt']
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=timeout)
+    at.run()
+    tokenizer_select = next(select for select in at.selectbox if select.label == "🤖 Select Tokenizer")
+    tokenizer_select.select(model_name).run()
+    timings = []
+    for i in range(iterations):
+        name, text = text_documents[(session + i) % len(text_documents)]
+        start = time.perf_counter()
+        at.text_area[0].input(f"{text}\n[session {session} request {i}]").run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            error = at.exception[0].message
+        elif at.error:
+            error = at.error[0].value
+        else:
+            error = None
+        timings.append({'document': name, 'extract': None, 'count': None, 'total': elapsed, 'error': error})
+    return timings
+
+def percentiles(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+def run_level(args, sessions, documents, token_counter, worker_pool):
+    """Run one concurrency level and summarize it"""
+    with ResourceMonitor() as monitor, ThreadPoolExecutor(max_workers=sessions) as pool:
+        start = time.perf_counter()
+        if args.driver == 'app':
+            futures = [pool.submit(app_session, s, args.iterations, documents, args.model, args.timeout)
+                       for s in range(sessions)]
+        else:
+            futures = [pool.submit(pipeline_session, s, args.iterations, documents, token_counter,
+                                   worker_pool, args.model) for s in range(sessions)]
+        timings = [timing for future in futures for timing in future.result()]
+        wall = time.perf_counter() - start
+
+    return {
+        'sessions': sessions,
+        'requests': len(timings),
+        'errors': sum(1 for timing in timings if timing['error']),
+        'throughput_rps': len(timings) / wall,
+        'extract_ms': percentiles([t['extract'] for t in timings]),
+        'count_ms': percentiles([t['count'] for t in timings]),
+        'total_ms': percentiles([t['total'] for t in timings]),
+        'cpu_percent': monitor.cpu_percent,
+        'peak_rss_mb': monitor.peak_rss / (1 << 20),
+    }
+
+def write_report(args, levels, path):
+    """Markdown capacity report plus the raw numbers as JSON next to it"""
+    # Capacity is the last level before the first one that misses the SLO or errors,
+    # so a lucky pass at a higher level cannot hide a failure below it
+    capacity = 0
+    for level in sorted(levels, key=lambda level: level['sessions']):
+        if level['errors'] or level['total_ms']['p95'] > args.slo_ms:
+            break
+        capacity = level['sessions']
+
+    lines = [
+        "# TokenForge Capacity Report",
+        "",
+        f"- Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"- Driver: {args.driver} | Model: {args.model} | Iterations per session: {args.iterations}",
+        f"- Extraction workers: {args.workers} | CPUs: {os.cpu_count()} | psutil: {'yes' if psutil else 'no (app-process CPU, cumulative peak RSS)'}",
+        f"- p95 SLO: {args.slo_ms:.0f} ms -> **sustained {capacity} concurrent sessions**",
+        "",
+        "| Sessions | Requests | Errors | Req/s | Extract p50/p95/p99 ms | Count p50/p95/p99 ms "
+        "| Total p50/p95/p99 ms | CPU % | Peak RSS MB |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for level in levels:
+        fmt = lambda p: f"{p['p50']:.0f} / {p['p95']:.0f} / {p['p99']:.0f}" if p else "n/a"
+        lines.append(
+            f"| {level['sessions']} | {level['requests']} | {level['errors']} | {level['throughput_rps']:.1f} "
+            f"| {fmt(level['extract_ms'])} | {fmt(level['count_ms'])} | {fmt(level['total_ms'])} "
+            f"| {level['cpu_percent']:.0f} | {level['peak_rss_mb']:.0f} |"
+        )
+
+    report = "\n".join(lines) + "\n"
+    Path(path).write_text(report, encoding='utf-8')
+    Path(path).with_suffix('.json').write_text(
+        json.dumps({'config': vars(args), 'capacity_sessions': capacity, 'levels': levels}, indent=2),
+        encoding='utf-8'
+    )
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="TokenForge concurrent-session load test")
+    parser.add_argument('--driver', choices=['pipeline', 'app'], default='pipeline',
+                        help="pipeline: headless upload path (extraction + counting); app: full reruns via AppTest")
+    parser.add_argument('--sessions', default='1,2,4,8,16', help="Comma-separated concurrency levels")
+    parser.add_argument('--iterations', type=int, default=10, help="Requests per session at each level")
+    parser.add_argument('--model', default='cl100k_base', help="Tokenizer to count with")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction worker processes")
+    parser.add_argument('--slo-ms', type=float, default=2000, help="p95 latency target for the capacity figure")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-rerun timeout for the app driver")
+    parser.add_argument('--output', default='loadtest_report.md', help="Report path (JSON written alongside)")
+    args = parser.parse_args()
+
+    token_counter = TokenCounter()
+    if args.model not in token_counter.get_available_tokenizers():
+        print(f"❌ Tokenizer {args.model} not available")
+        return 1
+
+    documents = load_documents()
+    levels = []
+    with ExtractionWorkerPool(workers=args.workers) as worker_pool:
+        args.workers = worker_pool.workers
+        for sessions in (int(level) for level in args.sessions.split(',')):
+            print(f"🔄 {sessions} concurrent sessions...")
+            levels.append(run_level(args, sessions, documents, token_counter, worker_pool))
+
+    print(write_report(args, levels, args.output))
+    print(f"📄 Report written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Incremental re-run tests for the SQLite folder index behind corpus.py index"""
+
+import os
+
+import pytest
+
+from app import DocumentIndex, index_folder
+
+class WordTokenCounter:
+    """Token counter that counts whitespace-separated words"""
+
+    def get_available_tokenizers(self):
+        return ['words']
+
+    def count_tokens(self, text, model_name):
+        return {'token_count': len(text.split())}
+
+@pytest.fixture
+def index(tmp_path):
+    index = DocumentIndex(tmp_path / 'index.db')
+    yield index
+    index.close()
+
+def write_documents(root, documents):
+    for name, text in documents.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+def table_rows(index, table):
+    return index.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_path_range_covers_root_and_descendants_only(tmp_path):
+    root = tmp_path / 'docs'
+    path, low, high = DocumentIndex._path_range(root)
+    assert path == str(root.resolve())
+
+    inside = [str(root / 'a.txt'), str(root / 'sub' / 'b.txt')]
+    outside = [str(tmp_path / 'docs-old' / 'a.txt'), str(tmp_path / 'docs0' / 'a.txt'), str(tmp_path / 'docsx.txt')]
+    assert all(low <= p < high for p in inside)
+    assert not any(low <= p < high or p == path for p in outside)
+
+def test_rerun_skips_unchanged_files_and_prunes_deleted_ones(tmp_path, index):
+    root = tmp_path / 'docs'
+    sibling = tmp_path / 'docs-old'
+    write_documents(root, {'a.txt': "one two three", 'b.txt': "four five", os.path.join('sub', 'c.txt'): "six"})
+    write_documents(sibling, {'d.txt': "seven eight nine ten"})
+    counter = WordTokenCounter()
+
+    stats = index_folder(root, counter, index)
+    assert (stats['scanned'], stats['processed'], stats['removed']) == (3, 3, 0)
+    index_folder(sibling, counter, index)
+    assert index.folder_totals(root).loc['words', 'tokens'] == 6
+
+    (root / 'b.txt').unlink()
+    stats = index_folder(root, counter, index)
+    assert (stats['scanned'], stats['unchanged'], stats['processed'], stats['removed']) == (2, 2, 0, 1)
+
+    totals = index.folder_totals(root)
+    assert (totals.loc['words', 'files'], totals.loc['words', 'tokens']) == (2, 4)
+    # The sibling sorts just before 'docs/' and must survive pruning; b.txt's content is orphaned
+    assert index.folder_totals(sibling).loc['words', 'tokens'] == 4
+    assert table_rows(index, 'documents') == 3
+    assert table_rows(index, 'token_counts') == 3
+
+def test_renamed_file_is_rehashed_not_extracted(tmp_path, index):
+    root = tmp_path / 'docs'
+    write_documents(root, {'a.txt': "one two three"})
+    index_folder(root, WordTokenCounter(), index)
+
+    (root / 'a.txt').rename(root / 'renamed.txt')
+    stats = index_folder(root, WordTokenCounter(), index)
+    assert (stats['rehashed'], stats['processed'], stats['removed']) == (1, 0, 1)
+    assert index.folder_totals(root).loc['words', 'files'] == 1
+
+def test_single_file_root(tmp_path, index):
+    root = tmp_path / 'docs'
+    write_documents(root, {'a.txt': "one two three", 'b.txt': "four five"})
+
+    stats = index_folder(root / 'a.txt', WordTokenCounter(), index)
+    assert (stats['scanned'], stats['processed']) == (1, 1)
+    assert index.folder_totals(root / 'a.txt').loc['words', 'tokens'] == 3
+
+    stats = index_folder(root, WordTokenCounter(), index)
+    assert (stats['unchanged'], stats['processed']) == (1, 1)
+    # Re-indexing the file alone must not prune its siblings
+    stats = index_folder(root / 'a.txt', WordTokenCounter(), index)
+    assert stats['removed'] == 0
+    assert index.folder_totals(root).loc['words', 'files'] == 2
+
+def test_missing_or_empty_root_keeps_index_entries(tmp_path, index):
+    root = tmp_path / 'docs'
+    write_documents(root, {'a.txt': "one two three"})
+    index_folder(root, WordTokenCounter(), index)
+
+    with pytest.raises(FileNotFoundError):
+        index_folder(tmp_path / 'unmounted', WordTokenCounter(), index)
+
+    (root / 'a.txt').rename(tmp_path / 'a.txt')
+    stats = index_folder(root, WordTokenCounter(), index)
+    assert (stats['scanned'], stats['removed']) == (0, 0)
+    assert index.folder_totals(root).loc['words', 'files'] == 1
@@ -0,0 +1,103 @@
+"""Text coverage tests for the streaming DOCX extractor"""
+
+import io
+import zipfile
+
+import docx
+
+from app import DocumentProcessor
+
+WORD_NS = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+           'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+           'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+           'xmlns:v="urn:schemas-microsoft-com:vml"')
+
+def saved(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def package(parts):
+    """Minimal DOCX-shaped zip; the extractor only reads the word/*.xml text parts"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, body in parts.items():
+            archive.writestr(name, f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>{body}')
+    buffer.seek(0)
+    return buffer
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+def test_body_paragraphs_and_tables_in_order():
+    document = docx.Document()
+    document.add_paragraph("Before the table")
+    table = document.add_table(rows=2, cols=2)
+    for row, cells in enumerate(table.rows):
+        for col, cell in enumerate(cells.cells):
+            cell.text = f"r{row}c{col}"
+    run = document.add_paragraph("Tab").add_run()
+    run.add_tab()
+    run.add_text("and")
+    run.add_break()
+    run.add_text("break")
+
+    lines = DocumentProcessor.extract_docx(saved(document)).split("\n")
+    assert lines[0] == "Before the table"
+    assert lines[1:5] == ["r0c0", "r0c1", "r1c0", "r1c1"]
+    assert lines[5:] == ["Tab\tand", "break"]
+
+def test_headers_and_footers_follow_the_body():
+    document = docx.Document()
+    document.add_paragraph("Body text")
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "Confidential header"
+    section.footer.paragraphs[0].text = "Page footer"
+
+    text = DocumentProcessor.extract_docx(saved(document))
+    assert text.split("\n") == ["Body text", "Confidential header", "Page footer"]
+
+def test_alternate_content_fallback_is_not_duplicated():
+    text_box = (
+        '<w:txbxContent>'
+        + paragraph("Inside the box")
+        + '</w:txbxContent>'
+    )
+    body = (
+        f'<w:document {WORD_NS}><w:body><w:p><w:r><w:t>Anchor</w:t></w:r><w:r>'
+        '<mc:AlternateContent>'
+        f'<mc:Choice Requires="wps"><w:drawing><wps:txbx>{text_box}</wps:txbx></w:drawing></mc:Choice>'
+        f'<mc:Fallback><w:pict><v:textbox>{text_box}</v:textbox></w:pict></mc:Fallback>'
+        '</mc:AlternateContent>'
+        f'</w:r></w:p>{paragraph("After")}</w:body></w:document>'
+    )
+
+    text = DocumentProcessor.extract_docx(package({'word/document.xml': body}))
+    assert text.count("Inside the box") == 1
+    assert text.split("\n") == ["Inside the box", "Anchor", "After"]
+
+def test_nested_text_box_paragraphs_keep_their_own_text():
+    body = (
+        f'<w:document {WORD_NS}><w:body>'
+        '<w:p><w:r><w:t>Outer start </w:t></w:r><w:r><w:pict><v:textbox><w:txbxContent>'
+        f'{paragraph("First box line")}{paragraph("Second box line")}'
+        '</w:txbxContent></v:textbox></w:pict></w:r><w:r><w:t>outer end</w:t></w:r></w:p>'
+        '</w:body></w:document>'
+    )
+
+    text = DocumentProcessor.extract_docx(package({'word/document.xml': body}))
+    assert text.split("\n") == ["First box line", "Second box line", "Outer start outer end"]
+
+def test_parts_are_read_in_document_order():
+    parts = {
+        'word/footnotes.xml': f'<w:footnotes {WORD_NS}><w:footnote>{paragraph("Footnote")}</w:footnote></w:footnotes>',
+        'word/footer1.xml': f'<w:ftr {WORD_NS}>{paragraph("Footer")}</w:ftr>',
+        'word/header2.xml': f'<w:hdr {WORD_NS}>{paragraph("Second header")}</w:hdr>',
+        'word/header1.xml': f'<w:hdr {WORD_NS}>{paragraph("First header")}</w:hdr>',
+        'word/document.xml': f'<w:document {WORD_NS}><w:body>{paragraph("Body")}</w:body></w:document>',
+        'word/styles.xml': f'<w:styles {WORD_NS}>{paragraph("Not text")}</w:styles>',
+    }
+
+    text = DocumentProcessor.extract_docx(package(parts))
+    assert text.split("\n") == ["Body", "First header", "Second header", "Footer", "Footnote"]
@@ -0,0 +1,73 @@
+"""Round-trip tests for the token shard format read by downstream training jobs"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app import TokenShardReader, TokenShardWriter
+
+class ArrayTokenCounter:
+    """Token counter whose 'texts' are already token ID lists"""
+
+    def __init__(self, vocab_size):
+        self._vocab_size = vocab_size
+
+    def vocab_size(self, model_name):
+        return self._vocab_size
+
+    def encode_ids_batch(self, texts, model_name):
+        return [np.asarray(ids, dtype=np.uint32) for ids in texts]
+
+@pytest.mark.parametrize('vocab_size, dtype', [(50_257, '<u2'), (100_277, '<u4')])
+def test_round_trip_across_shards(tmp_path, vocab_size, dtype):
+    rng = np.random.default_rng(0)
+    documents = [rng.integers(0, vocab_size, length) for length in (7, 0, 5, 12, 0, 3)]
+    sources = ['a.txt', 'empty.txt', 'ü/b.pdf', 'c.docx', 'blank.pdf', 'd.txt']
+    prefix = tmp_path / 'out' / 'corpus'
+
+    with TokenShardWriter(prefix, ArrayTokenCounter(vocab_size), 'enc', shard_tokens=10) as writer:
+        writer.add_documents(sources[:3], documents[:3])
+        writer.add_documents(sources[3:], documents[3:])
+
+    manifest = json.loads((tmp_path / 'out' / 'corpus.json').read_text(encoding='utf-8'))
+    assert manifest['encoding'] == 'enc'
+    assert manifest['dtype'] == dtype
+    assert manifest['documents'] == len(documents)
+    assert manifest['total_tokens'] == sum(len(ids) for ids in documents)
+    assert len(manifest['shards']) > 1
+    for shard in manifest['shards']:
+        assert (tmp_path / 'out' / shard['file']).stat().st_size == shard['tokens'] * np.dtype(dtype).itemsize
+
+    reader = TokenShardReader(prefix)
+    assert len(reader) == len(documents)
+    assert reader.sources() == sources
+    for number, ids in enumerate(documents):
+        assert reader[number].dtype == np.dtype(dtype)
+        np.testing.assert_array_equal(reader[number], ids)
+
+def test_document_larger_than_shard_is_not_split(tmp_path):
+    prefix = tmp_path / 'corpus'
+    documents = [np.arange(4), np.arange(25), np.arange(6)]
+
+    with TokenShardWriter(prefix, ArrayTokenCounter(1000), 'enc', shard_tokens=10) as writer:
+        writer.add_documents(['a', 'b', 'c'], documents)
+
+    reader = TokenShardReader(prefix)
+    assert [int(record['shard']) for record in reader.index] == [0, 1, 2]
+    for number, ids in enumerate(documents):
+        np.testing.assert_array_equal(reader[number], ids)
+
+def test_failed_export_leaves_no_manifest(tmp_path):
+    prefix = tmp_path / 'corpus'
+    with TokenShardWriter(prefix, ArrayTokenCounter(1000), 'enc') as writer:
+        writer.add_documents(['old'], [np.arange(3)])
+    assert (tmp_path / 'corpus.json').exists()
+
+    with pytest.raises(RuntimeError):
+        with TokenShardWriter(prefix, ArrayTokenCounter(1000), 'enc', shard_tokens=10) as writer:
+            writer.add_documents(['a', 'b'], [np.arange(4), np.arange(12)])
+            raise RuntimeError("extraction failed")
+
+    assert not (tmp_path / 'corpus.json').exists()
+    assert not (tmp_path / 'corpus.json.tmp').exists()